@@ -0,0 +1,181 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from contextlib import redirect_stderr
+from io import StringIO
+
+import numpy as np
+
+from src.arm import Arm
+from src.GS import GS_Market
+from src.player import Player
+
+
+def time_call(function, repeat=5, number=1):
+    '''
+        Seconds per call of function, the best and the median of repeat runs of number calls
+    '''
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        runs.append((time.perf_counter() - start) / number)
+    return {'seconds': min(runs), 'median': float(np.median(runs))}
+
+
+def gs_rankings(structure, size, rng):
+    '''
+        Rankings of a square market: identical as in example 7, random as in example 6,
+        or adversarial, the worst case of GS with size * (size - 1) + 1 proposals
+    '''
+    if structure == 'identical':
+        return np.tile(np.arange(size), (size, 1)), np.tile(np.arange(size), (size, 1))
+    if structure == 'random':
+        return np.argsort(rng.random((size, size)), axis=1), np.argsort(rng.random((size, size)), axis=1)
+    if structure == 'adversarial':
+        last = size - 1
+        cycle = (np.arange(last)[:, None] + np.arange(last)) % last
+        players_rankings = np.tile(np.arange(size), (size, 1))
+        players_rankings[:last, :last] = cycle
+        arms_rankings = np.tile(np.arange(size), (size, 1))
+        arms_rankings[:last] = np.insert(np.roll(cycle, -1, axis=1), 1, last, axis=1)
+        return players_rankings, arms_rankings
+    raise ValueError("Unknown structure " + structure)
+
+
+def bench_Gale_Shapley(sizes, rng, repeat):
+    results = {}
+    for structure in ['identical', 'random', 'adversarial']:
+        for size in sizes:
+            market = GS_Market(size, size, warm_start=False)
+            market.players_rankings, market.arms_rankings = gs_rankings(structure, size, rng)
+            results['GS/%s/%d' % (structure, size)] = time_call(market.Gale_Shapley, repeat)
+    return results
+
+
+def bench_player(sizes, rng, repeat, number=1000):
+    results = {}
+    for size in sizes:
+        player = Player(size, np.arange(size))
+        player.ucb = rng.random(size)
+        results['player/get_ranking/%d' % size] = time_call(player.get_ranking, repeat, number)
+
+        arms_idx = rng.integers(size, size=number).tolist()
+        rewards = rng.random(number).tolist()
+
+        def update():
+            for a_idx, reward in zip(arms_idx, rewards):
+                player.update(a_idx, reward, 100)
+        results['player/update/%d' % size] = per_call(time_call(update, repeat), number)
+    return results
+
+
+def bench_arm(repeat, number=1000):
+    arm = Arm(10, np.linspace(0.9, 0, 10), 1, np.arange(10))
+    return {'arm/sample': time_call(lambda: arm.sample(3), repeat, number)}
+
+
+def per_call(timing, calls):
+    return {name: seconds / calls for name, seconds in timing.items()}
+
+
+def bench_experiments(horizon, repeat):
+    '''
+        Seconds per round of the full simulations, rounds per second being the inverse
+    '''
+    from exp_centrailized_ucb_etc import Exp_centralized_UCB_ETC
+    from exp_example7 import Exp_example7
+
+    example7 = Exp_example7()
+    example7.horizon, example7.trials = horizon, 1
+    centralized = Exp_centralized_UCB_ETC(horizon=horizon, trials=1)
+
+    cases = {'rounds/example7_UCB': example7.run_example7_UCB,
+             'rounds/example7_UCB_vectorized': lambda: example7.run_example7_UCB(vectorized=True),
+             'rounds/centralized_UCB': centralized.run_centralized_UCB,
+             'rounds/centralized_ETC': lambda: centralized.run_centralized_ETC(h=10)}
+
+    results = {}
+    for name, run in cases.items():
+        # keep the progress bars of the experiments out of the report
+        with redirect_stderr(StringIO()):
+            results[name] = per_call(time_call(run, repeat), horizon)
+    return results
+
+
+def run_benchmarks(quick=False, only=None, seed=0):
+    rng = np.random.default_rng(seed)
+    repeat = 3 if quick else 5
+    sizes = [10, 50] if quick else [10, 50, 200, 1000]
+    horizon = 500 if quick else 4000
+
+    suites = {'GS': lambda: bench_Gale_Shapley(sizes, rng, repeat),
+              'player': lambda: bench_player(sizes, rng, repeat),
+              'arm': lambda: bench_arm(repeat),
+              'rounds': lambda: bench_experiments(horizon, repeat)}
+
+    results = {}
+    for name, suite in suites.items():
+        if only is None or name in only:
+            results.update(suite())
+
+    return {'machine': {'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'platform': platform.platform(),
+                        'processor': platform.processor()},
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick,
+            'results': results}
+
+
+def compare(old, new, threshold=0.1):
+    '''
+        Ratio of the new over the old best time of every benchmark found in both runs,
+        a ratio above 1 + threshold being a slowdown. Returns the names of the slowdowns.
+    '''
+    slowdowns = []
+    print('%-40s %12s %12s %8s' % ('benchmark', 'old (s)', 'new (s)', 'ratio'))
+    for name in sorted(set(old['results']) & set(new['results'])):
+        old_seconds = old['results'][name]['seconds']
+        new_seconds = new['results'][name]['seconds']
+        ratio = new_seconds / old_seconds
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  SLOWER'
+            slowdowns.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = '  faster'
+        print('%-40s %12.3e %12.3e %8.2f%s' % (name, old_seconds, new_seconds, ratio, flag))
+
+    for name in sorted(set(old['results']) ^ set(new['results'])):
+        print('%-40s only in one run' % name)
+    return slowdowns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the matching market simulators")
+    parser.add_argument('--output', default='benchmark.json', help="where to write the results")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes and fewer repeats")
+    parser.add_argument('--only', nargs='+', choices=['GS', 'player', 'arm', 'rounds'],
+                        help="run only these suites")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two result files instead of running")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown flagged by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+    report = run_benchmarks(args.quick, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for name, timing in sorted(report['results'].items()):
+        print('%-40s %12.3e s' % (name, timing['seconds']))
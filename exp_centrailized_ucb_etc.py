@@ -1,123 +1,274 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
 
-from src.arm import Arm
+from src.backend import Backend_Market
+from src.convergence import stable_until_horizon
+from src.engine import Vectorized_Market
+from src.experiment import Experiment
 from src.GS import GS_Market
-from src.player import Player
+from src.progress import progress_bar
+from src.regret import Regret_Accumulator
+from src.reward import Philox_Reward_Oracle, set_reward_streams
+from src.state import Market_State
+from src.storage import plot_points, store_path
+from src.sweep import Sweep, expand_grid
 
 
-class Exp_centralized_UCB_ETC(object):
+class Exp_centralized_UCB_ETC(Experiment):
     '''
         Extra experiments with the centralized UCB and centralized ETC algorithm
     '''
+
+    results = ('market_state', 'players', 'arms', 'regrets_ucb', 'regrets_etc')
     
-    def __init__(self):
-        self.num_players = 10
-        self.num_arms = 10
-        self.arms_var = 1
-        self.horizon = 4000
-        self.trials = 10
+    def __init__(self, num_players=10, num_arms=10, horizon=4000, trials=10, bernoulli=False, dtype=float,
+                 arms_var=1):
+        self.num_players = num_players
+        self.num_arms = num_arms
+        self.arms_var = arms_var
+        self.bernoulli = bernoulli
+        self.dtype = dtype
+        self.horizon = horizon
+        self.trials = trials
 
         self.players_rankings = np.arange(self.num_arms)
-        self.players = [Player(self.num_arms, self.players_rankings) 
-                        for j in range(self.num_players)]
+        self.market_state = Market_State(self.num_players, self.num_arms, self.dtype)
+        self.players = self.market_state.make_players([self.players_rankings] * self.num_players)
 
         self.arms_mean = np.linspace(0.9, 0, self.num_arms)
         self.arms_rankings = np.arange(self.num_players)
-        self.arms = [Arm(self.num_players, self.arms_mean[j]*np.ones(self.num_players), self.arms_var, self.arms_rankings) 
-                        for j in range(self.num_arms)]
+        self.arms = self.market_state.make_arms(self.arms_mean[:, None] * np.ones(self.num_players), self.arms_var,
+                                                [self.arms_rankings] * self.num_arms, bernoulli=self.bernoulli)
         
         self.two_side_market = GS_Market(self.num_players, self.num_arms)
         self.optimal_matching = self.two_side_market.get_optimal_matching(self.players, self.arms).tolist()
+        self.pessimal_matching = self.two_side_market.get_pessimal_matching(self.players, self.arms).tolist()
 
         self.regrets_ucb = []
         self.regrets_etc = []
 
 
-    def run_centralized_UCB(self, optimal=True):
+    def reference_matching(self, optimal=True):
+        return self.optimal_matching if optimal else self.pessimal_matching
 
-        regrets = np.zeros([self.num_players, self.horizon])
-        
-        # string = "optimal" if optimal else "pessimal"
-        for _ in tqdm(range(self.trials), ascii=True, desc="Running the centralized UCB "):
-            regrets_one_trial = [[] for _ in range(self.num_players)]
+    def run_settings(self, optimal=True, vectorized=False):
+        '''
+            Everything the regrets depend on besides the algorithm, the configuration
+            of a sweep job
+        '''
+        return {'num_players': self.num_players,
+                'num_arms': self.num_arms,
+                'horizon': self.horizon,
+                'trials': self.trials,
+                'arms_var': self.arms_var,
+                'bernoulli': self.bernoulli,
+                'dtype': np.dtype(self.dtype).name,
+                'reward_chunk': self.reward_chunk,
+                'reward_blocks': self.reward_blocks,
+                'reward_oracle': None if self.reward_oracle is None else self.reward_oracle.seed,
+                'fast_forward': self.fast_forward,
+                'backend': self.backend,
+                'optimal': optimal,
+                'vectorized': vectorized}
 
-            for _ in range(self.horizon):
-                matching_result = self.two_side_market.match(self.players, self.arms)
-                
-                for a_idx in range(self.num_arms):
-                    if matching_result[a_idx] != None:
-                        p_idx = matching_result[a_idx]
-                        regret = self.arms[self.optimal_matching.index(p_idx)].mean[p_idx] - \
-                                 self.arms[a_idx].mean[p_idx]
-                        regrets_one_trial[p_idx].append(regret)
-        
-            regrets += np.cumsum(np.array(regrets_one_trial), axis=1)
-            self.two_side_market.reset(self.players)
+    def configure(self, config):
+        '''
+            Sets the attributes of run_settings not taken by the constructor
+        '''
+        self.reward_chunk = config['reward_chunk']
+        self.reward_blocks = config['reward_blocks']
+        self.reward_oracle = None if config['reward_oracle'] is None else \
+            Philox_Reward_Oracle(config['reward_oracle'], self.num_arms, self.num_players)
+        self.fast_forward = config['fast_forward']
+        self.backend = config['backend']
+
+    def run_centralized_UCB(self, optimal=True, vectorized=False, workers=None, seed=None):
+        regret_accumulator = Regret_Accumulator.from_arms(self.arms, self.reference_matching(optimal), self.horizon,
+                                                          store_dir=store_path(self.storage_dir, 'centralized_UCB'))
+        self.fast_forward_rounds = []
+
+        # advance all trials at once with the array based engine
+        if vectorized:
+            self.check_options("The vectorized engine", self.players)
+            return Vectorized_Market.from_objects(self.arms) \
+                        .run_UCB(self.horizon, self.trials, regret_accumulator, seed)
+        if self.backend is not None:
+            self.check_options("The backend " + self.backend, self.players)
+            return Backend_Market.from_objects(self.arms, self.backend) \
+                        .run_UCB(self.horizon, self.trials, regret_accumulator, workers, seed)
+
+        # string = "optimal" if optimal else "pessimal"
+        trials = self.object_trials('run_centralized_UCB_trial', self.players, self.arms, regret_accumulator,
+                                    workers, seed)
+        progress = progress_bar(trials, total=self.trials, ascii=True, desc="Running the centralized UCB ")
+        for regrets_one_trial in progress:
+            regret_accumulator.add_trial(regrets_one_trial)
+            if self.two_side_market.stats is not None:
+                progress.set_postfix_str(self.two_side_market.stats.summary())
         
-        regrets /= self.trials
-        return regrets
+        return regret_accumulator.regrets
+
+    def run_centralized_UCB_trial(self, players, arms, regret_accumulator, rng=None, trial_idx=0):
+        '''
+            Runs a single trial of UCB and returns the cumulative regrets of the players
+        '''
+        self.two_side_market.reset(players)
+        set_reward_streams(arms, rng, self.reward_chunk, self.reward_blocks,
+                           self.reward_oracle, trial_idx)
+        regret_accumulator.start_trial()
+
+        stats = self.two_side_market.stats
+        fast_forwarded = None
+        for _ in range(self.horizon):
+            matching_result = self.two_side_market.match(players, arms)
+            if stats is not None:
+                tic = stats.tic()
+            regret_accumulator.record(matching_result)
+            if stats is not None:
+                stats.add('regret', tic)
+
+            # credit the remaining rounds at once once the matching provably stays
+            if self.fast_forward is not None and self.two_side_market.t % self.fast_forward == 0 \
+                and self.two_side_market.t < self.horizon \
+                and stable_until_horizon(self.two_side_market, players, arms,
+                                         matching_result, self.horizon):
+                fast_forwarded = self.two_side_market.t
+                regret_accumulator.record(matching_result, self.horizon - fast_forwarded)
+                break
 
-    def run_centralized_ETC(self, h, optimal=True):
-        regrets = np.zeros([self.num_players, self.horizon])
+        self.fast_forward_rounds.append(fast_forwarded)
+        return regret_accumulator.finish_trial()
+
+    def run_centralized_ETC(self, h, optimal=True, vectorized=False, workers=None, seed=None):
+        if vectorized:
+            h_seed = None if seed is None else [seed, h]
+            return self.run_centralized_ETC_vectorized([h], h_seed, optimal)[0]
+
+        regret_accumulator = Regret_Accumulator.from_arms(self.arms, self.reference_matching(optimal), self.horizon,
+                                                          store_dir=store_path(self.storage_dir, 'centralized_ETC_' + str(h)))
         
         # string = "optimal" if optimal else "pessimal"
-        for _ in tqdm(range(self.trials), ascii=True, desc="Running the centralized ETC "):
-            regrets_one_trial = [[] for _ in range(self.num_players)]
-
-            matching_result = None
-            for t in range(self.horizon):
-                # Explore
-                if t < h * self.num_arms:
-                    for p_idx in range(self.num_players):
-                        a_idx = ((t + p_idx) % self.num_arms)
-                        reward = self.arms[a_idx].sample(p_idx)
-
-                        self.two_side_market.proceed()
-                        self.players[p_idx].update(a_idx, reward, self.two_side_market.t)
-                        regret = self.arms[self.optimal_matching.index(p_idx)].mean[p_idx] - \
-                                 self.arms[a_idx].mean[p_idx]
-                        regrets_one_trial[p_idx].append(regret)
-                
-                # Commit
-                else:
-                    if t == h * self.num_arms:
-                        matching_result = self.two_side_market.match(self.players, self.arms, ucb=False)
-                    
-                    # self.two_side_market.proceed()
-                    for a_idx in range(self.num_arms):
-                        if matching_result[a_idx] != None:
-                            p_idx = matching_result[a_idx]
-                            regret = self.arms[self.optimal_matching.index(p_idx)].mean[p_idx] - \
-                                    self.arms[a_idx].mean[p_idx]
-                            regrets_one_trial[p_idx].append(regret)
-            
-            regrets += np.cumsum(np.array(regrets_one_trial), axis=1)
-            self.two_side_market.reset(self.players)
+        h_seed = None if seed is None else [seed, h]
+        trials = self.object_trials('run_centralized_ETC_trial', self.players, self.arms, regret_accumulator,
+                                    workers, h_seed, (h,))
+        progress = progress_bar(trials, total=self.trials, ascii=True, desc="Running the centralized ETC ")
+        for regrets_one_trial in progress:
+            regret_accumulator.add_trial(regrets_one_trial)
+            if self.two_side_market.stats is not None:
+                progress.set_postfix_str(self.two_side_market.stats.summary())
         
-        regrets /= self.trials
-        return regrets
+        return regret_accumulator.regrets
 
-    def run_centralized_UCB_ETC(self, explore_rounds):
-        self.regrets_ucb = self.run_centralized_UCB()
-        self.regrets_etc = [self.run_centralized_ETC(h) for h in explore_rounds]
+    def run_centralized_ETC_vectorized(self, explore_rounds, seed=None, optimal=True):
+        '''
+            ETC with every exploration length at once, sharing the exploration streams spawned from seed
+        '''
+        self.check_options("The vectorized engine", self.players)
+        regret_accumulators = [Regret_Accumulator.from_arms(self.arms, self.reference_matching(optimal), self.horizon)
+                               for _ in explore_rounds]
+        return Vectorized_Market.from_objects(self.arms) \
+                    .run_ETC(self.horizon, self.trials, explore_rounds, regret_accumulators, seed)
+
+    def run_centralized_ETC_trial(self, h, players, arms, regret_accumulator, rng=None, trial_idx=0):
+        '''
+            Runs a single trial of ETC exploring h rounds per arm and returns the
+            cumulative regrets of the players
+        '''
+        self.two_side_market.reset(players)
+        set_reward_streams(arms, rng, self.reward_chunk, self.reward_blocks,
+                           self.reward_oracle, trial_idx)
+        regret_accumulator.start_trial()
+
+        stats = self.two_side_market.stats
+        players_idx = np.arange(self.num_players)
+        matching_result = None
+        for t in range(self.horizon):
+            if stats is not None:
+                tic = stats.tic()
+
+            # Explore
+            if t < h * self.num_arms:
+                for p_idx in range(self.num_players):
+                    a_idx = ((t + p_idx) % self.num_arms)
+                    reward = arms[a_idx].sample(p_idx, t + 1)
+
+                    self.two_side_market.proceed()
+                    players[p_idx].update(a_idx, reward, self.two_side_market.t)
+                if stats is not None:
+                    tic = stats.add('update', tic)
+                regret_accumulator.record_pairs(players_idx, (t + players_idx) % self.num_arms)
+            
+            # Commit
+            else:
+                if t == h * self.num_arms:
+                    matching_result = self.two_side_market.match(players, arms, ucb=False)
+                    if stats is not None:
+                        tic = stats.tic()
+                
+                # self.two_side_market.proceed()
+                regret_accumulator.record(matching_result)
+
+            if stats is not None:
+                stats.add('regret', tic)
+
+        return regret_accumulator.finish_trial()
+
+    def run_centralized_UCB_ETC(self, explore_rounds, vectorized=False, workers=None, seed=None,
+                                cache_dir=None, optimal=True):
+        '''
+            With cache_dir every algorithm and exploration length is a job of a sweep
+            cached on disk, the cached ones being skipped when run again
+        '''
+        if cache_dir is not None:
+            base = self.run_settings(optimal, vectorized)
+            configs = [dict(base, algorithm='UCB')] + \
+                      expand_grid({'h': list(explore_rounds)}, algorithm='ETC', **base)
+            results = Sweep(centralized_UCB_ETC_job, configs, cache_dir, 0 if seed is None else seed,
+                            workers, type(self).__qualname__).run()
+            self.regrets_ucb = results[0]['regrets']
+            self.regrets_etc = [result['regrets'] for result in results[1:]]
+            return
+
+        self.regrets_ucb = self.run_centralized_UCB(optimal, vectorized, workers, seed)
+        if vectorized:
+            self.regrets_etc = self.run_centralized_ETC_vectorized(explore_rounds, seed, optimal)
+        else:
+            self.regrets_etc = [self.run_centralized_ETC(h, optimal, workers=workers, seed=seed)
+                                for h in explore_rounds]
 
     def plot_centralized_UCB_ETC(self, explore_rounds):
+        import matplotlib.pyplot as plt
+
         plt.figure(dpi = 200)
 
         plt.plot(np.linspace(0, self.horizon, 10),
-                 self.regrets_ucb[0][0:-1:int(self.horizon/10)], 
+                 plot_points(self.regrets_ucb, 0, int(self.horizon/10)), 
                  marker="o", linewidth = 0.8, label = 'UCB-Optimal')
 
+        # at most about 1000 points of each ETC curve are drawn
+        step = max(1, self.horizon // 1000)
         for i, h in enumerate(explore_rounds):
-            plt.plot(self.regrets_etc[i][0], linewidth = 0.8, label = 'ETC, h = ' + str(h))
+            plt.plot(np.arange(0, self.horizon, step), plot_points(self.regrets_etc[i], 0, step, None),
+                     linewidth = 0.8, label = 'ETC, h = ' + str(h))
         plt.legend()
         plt.xlabel('Time')
         plt.ylabel('Expected Regret')
         plt.title("Optimal Regret of Agent 1")
         plt.show()
 
+def centralized_UCB_ETC_job(config, seed):
+    '''
+        A single run of UCB or of ETC with h exploration rounds as a sweep job
+    '''
+    exp = Exp_centralized_UCB_ETC(config['num_players'], config['num_arms'], config['horizon'], config['trials'],
+                                  config['bernoulli'], config['dtype'], config['arms_var'])
+    exp.configure(config)
+    if config['algorithm'] == 'UCB':
+        regrets = exp.run_centralized_UCB(config['optimal'], config['vectorized'], seed=seed)
+    else:
+        regrets = exp.run_centralized_ETC(config['h'], config['optimal'], config['vectorized'], seed=seed)
+    return {'regrets': regrets}
+
+
 if __name__ == "__main__":
 
     exp = Exp_centralized_UCB_ETC()
@@ -1,16 +1,20 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
 
-from src.arm import Arm
+from src.experiment import Experiment
 from src.GS import GS_Market
-from src.player import Player
+from src.progress import progress_bar
+from src.regret import Regret_Accumulator
+from src.reward import Philox_Reward_Oracle, set_reward_streams
+from src.state import Market_State
+from src.sweep import Sweep, expand_grid
 
 
-class Exp_example2():
+class Exp_example2(Experiment):
     '''
         Experiments with the centralized UCB algorithm with 2 players and 2 arms
     '''
+
+    results = ('regret_example2',)
     
     def __init__(self):
         self.num_players = 2
@@ -23,51 +27,104 @@ class Exp_example2():
         
         self.two_side_market = GS_Market(self.num_players, self.num_arms)
 
-    def run_example2_UCB(self, optimal=True):
+    def run_example2_UCB(self, optimal=True, workers=None, seed=None):
 
         self.regret_example2 = np.zeros([self.num_players, len(self.delta)])
 
         # string = "optimal" if optimal else "pessimal"
-        for i in tqdm(range(len(self.delta)), ascii=True, desc="Running the example 2 centralized UCB "):
+        progress = progress_bar(range(len(self.delta)), ascii=True, desc="Running the example 2 centralized UCB ")
+        for i in progress:
 
             # initialize players
             true_player_rankings = [[0, 1], [1, 0]]
-            players = [Player(self.num_arms, true_player_rankings[j])
-                        for j in range(self.num_players)]
+            market_state = Market_State(self.num_players, self.num_arms, self.dtype)
+            players = market_state.make_players(true_player_rankings)
 
             # initialize arms
             arms_mean =[[self.delta[i], 0], [0, 1]]
             arms_rankings = [[0, 1], [0, 1]]
-            arms = [Arm(self.num_players, arms_mean[j], self.arms_var, arms_rankings[j])
-                    for j in range(self.num_arms)]
-
-            # collect regrets
-            regrets = np.zeros([self.num_players, self.horizon])
-
-            # get the optimal matching
-            optimal_matching = self.two_side_market.get_optimal_matching(players, arms).tolist()
-            
-            for _ in range(self.trials):
-                regrets_one_trial = [[] for _ in range(self.num_players)]
-
-                for _ in range(self.horizon):
-                    matching_result = self.two_side_market.match(players, arms)
-
-                    for a_idx in range(self.num_arms):
-                        if matching_result[a_idx] != None:
-                            p_idx = matching_result[a_idx]
-                            regret = arms[optimal_matching.index(p_idx)].mean[p_idx] - \
-                                     arms[a_idx].mean[p_idx]
-                            regrets_one_trial[p_idx].append(regret)
-
-                regrets += np.cumsum(np.array(regrets_one_trial), axis=1)
-                self.two_side_market.reset(players)
+            arms = market_state.make_arms(arms_mean, self.arms_var, arms_rankings)
+
+            # get the optimal or the pessimal matching as the reference of the regrets
+            if optimal:
+                reference_matching = self.two_side_market.get_optimal_matching(players, arms).tolist()
+            else:
+                reference_matching = self.two_side_market.get_pessimal_matching(players, arms).tolist()
+
+            # only the regret at the horizon is kept
+            regret_accumulator = Regret_Accumulator.from_arms(arms, reference_matching, self.horizon,
+                                                              checkpoints=[self.horizon])
+
+            # each delta gets its own stream of seeds
+            delta_seed = None if seed is None else [seed, i]
+            for regrets_one_trial in self.object_trials('run_example2_UCB_trial', players, arms,
+                                                        regret_accumulator, workers, delta_seed):
+                regret_accumulator.add_trial(regrets_one_trial)
         
-            regrets /= self.trials
-            self.regret_example2[:, i] = regrets[:, -1]
-
+            self.regret_example2[:, i] = regret_accumulator.mean[:, -1]
+            if self.two_side_market.stats is not None:
+                progress.set_postfix_str(self.two_side_market.stats.summary())
+
+    def run_example2_UCB_trial(self, players, arms, regret_accumulator, rng=None, trial_idx=0):
+        '''
+            Runs a single trial and returns the cumulative regrets of the players
+        '''
+        self.two_side_market.reset(players)
+        set_reward_streams(arms, rng, self.reward_chunk, self.reward_blocks,
+                           self.reward_oracle, trial_idx)
+
+        regret_accumulator.start_trial()
+
+        stats = self.two_side_market.stats
+        for _ in range(self.horizon):
+            matching_result = self.two_side_market.match(players, arms)
+            if stats is not None:
+                tic = stats.tic()
+            regret_accumulator.record(matching_result)
+            if stats is not None:
+                stats.add('regret', tic)
+
+        return regret_accumulator.finish_trial()
+
+    def run_settings(self, optimal=True):
+        '''
+            Everything the regrets of a delta depend on besides delta, the configuration
+            of a sweep job
+        '''
+        return {'horizon': self.horizon,
+                'trials': self.trials,
+                'arms_var': self.arms_var,
+                'dtype': np.dtype(self.dtype).name,
+                'reward_chunk': self.reward_chunk,
+                'reward_blocks': self.reward_blocks,
+                'reward_oracle': None if self.reward_oracle is None else self.reward_oracle.seed,
+                'optimal': optimal}
+
+    def configure(self, config):
+        '''
+            Sets the attributes of run_settings
+        '''
+        self.horizon = config['horizon']
+        self.trials = config['trials']
+        self.arms_var = config['arms_var']
+        self.dtype = config['dtype']
+        self.reward_chunk = config['reward_chunk']
+        self.reward_blocks = config['reward_blocks']
+        self.reward_oracle = None if config['reward_oracle'] is None else \
+            Philox_Reward_Oracle(config['reward_oracle'], self.num_arms, self.num_players)
+
+    def run_example2_sweep(self, cache_dir, workers=None, seed=0, optimal=True):
+        '''
+            Same as run_example2_UCB with one cached job per delta, so resuming or
+            adding a delta only runs the deltas without a cached result
+        '''
+        configs = expand_grid({'delta': self.delta.tolist()}, **self.run_settings(optimal))
+        results = Sweep(example2_job, configs, cache_dir, seed, workers, type(self).__qualname__).run()
+        self.regret_example2 = np.array([result['regret'] for result in results]).T
 
     def plot_example2(self):
+        import matplotlib.pyplot as plt
+
         plt.figure(dpi=200)
         plt.plot(self.delta, self.regret_example2[0], marker="o", color = 'dodgerblue', linewidth = 0.8, label = 'Agent 1')
         plt.plot(self.delta, self.regret_example2[1], marker=">", color = 'blue', linewidth = 0.8, label = 'Agent 2')
@@ -77,6 +134,17 @@ class Exp_example2():
         plt.show()
 
 
+def example2_job(config, seed):
+    '''
+        The regrets at the horizon for a single delta as a sweep job
+    '''
+    exp = Exp_example2()
+    exp.configure(config)
+    exp.delta = np.array([config['delta']])
+    exp.run_example2_UCB(config['optimal'], seed=seed)
+    return {'regret': exp.regret_example2[:, 0]}
+
+
 if __name__ == "__main__":
     exp = Exp_example2()
     exp.run_example2_UCB()
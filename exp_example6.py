@@ -1,10 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
 
-from src.arm import Arm
+from src.experiment import Experiment
 from src.GS import GS_Market
-from src.player import Player
+from src.progress import progress_bar
+from src.regret import Regret_Accumulator
+from src.reward import set_reward_streams
+from src.state import Market_State
+from src.storage import plot_points, store_path
 
 
 class GS_Market_(GS_Market):
@@ -15,11 +17,13 @@ class GS_Market_(GS_Market):
         super().reset(players)
         players[self.num_players-1].ucb = np.array([2.3, 0, 0])
 
-class Exp_example6():
+class Exp_example6(Experiment):
     '''
         Experiments with the centralized UCB algorithm with 3 players and 3 arms
     '''
 
+    results = ('regret_accumulator', 'regrets', 'market_state')
+
     def __init__(self):
         self.num_players = 3
         self.num_arms = 3
@@ -29,56 +33,75 @@ class Exp_example6():
         
         self.two_side_market = GS_Market_(self.num_players, self.num_arms)
 
-    def run_example6_UCB(self, optimal=True):
+    def run_example6_UCB(self, optimal=True, workers=None, seed=None):
 
         # initialize players
         players_rankings = [[0, 1, 2], [1, 0, 2], [2, 0, 1]]
-        players = [Player(self.num_arms, players_rankings[i], oracle=True) for i in range(self.num_players-1)]
-        players.append(Player(self.num_arms, players_rankings[self.num_players-1]))
+        self.market_state = Market_State(self.num_players, self.num_arms, self.dtype)
+        players = self.market_state.make_players(players_rankings, oracles=[True] * (self.num_players-1) + [False])
         # players[self.num_players-1].ucb = np.array([2.3, 0, 0])
         
         # initialize arms
         arms_mean =[[2, 1, 1.95], [1, 2, 0],[0, 0, 2]]
         arms_rankings = [[1, 2, 0], [0, 1, 2], [2, 0, 1]]
-        arms = [Arm(self.num_players, arms_mean[i], self.arms_var, arms_rankings[i]) 
-                for i in range(self.num_arms)]
+        arms = self.market_state.make_arms(arms_mean, self.arms_var, arms_rankings)
 
-        # collect regrets
-        self.regrets = np.zeros([self.num_players, self.horizon])
+        # get the optimal or the pessimal matching as the reference of the regrets
+        if optimal:
+            reference_matching = self.two_side_market.get_optimal_matching(players, arms).tolist()
+        else:
+            reference_matching = self.two_side_market.get_pessimal_matching(players, arms).tolist()
 
-        # get the optimal matching
-        optimal_matching = self.two_side_market.get_optimal_matching(players, arms).tolist()
+        # collect regrets
+        self.regret_accumulator = Regret_Accumulator.from_arms(arms, reference_matching, self.horizon,
+                                                               store_dir=store_path(self.storage_dir, 'example6_UCB'))
         
         string = "optimal" if optimal else "pessimal"
-        for _ in tqdm(range(self.trials), ascii=True, desc="Running the example 6 centralized UCB "+string):
+        trials = self.object_trials('run_example6_UCB_trial', players, arms, self.regret_accumulator,
+                                    workers, seed)
+        progress = progress_bar(trials, total=self.trials, ascii=True,
+                                desc="Running the example 6 centralized UCB "+string)
+        for regrets_one_trial in progress:
+            self.regret_accumulator.add_trial(regrets_one_trial)
+            if self.two_side_market.stats is not None:
+                progress.set_postfix_str(self.two_side_market.stats.summary())
+
+        self.regrets = self.regret_accumulator.regrets
+
+    def run_example6_UCB_trial(self, players, arms, regret_accumulator, rng=None, trial_idx=0):
+        '''
+            Runs a single trial and returns the cumulative regrets of the players.
+            The market is reset first, so every trial starts from the same ucb of agent 3.
+        '''
+        self.two_side_market.reset(players)
+        set_reward_streams(arms, rng, self.reward_chunk, self.reward_blocks,
+                           self.reward_oracle, trial_idx)
+
+        regret_accumulator.start_trial()
+
+        stats = self.two_side_market.stats
+        for _ in range(self.horizon):
         
-            regrets_one_trial = [[] for i in range(self.num_players)]
-
-            for _ in range(self.horizon):
-            
-                matching_result = self.two_side_market.match(players, arms)
+            matching_result = self.two_side_market.match(players, arms)
+            if stats is not None:
+                tic = stats.tic()
+            regret_accumulator.record(matching_result)
+            if stats is not None:
+                stats.add('regret', tic)
 
-                for a_idx in range(self.num_arms):
-                    if matching_result[a_idx] != None:
-                        p_idx = matching_result[a_idx]
-                        regret = arms[optimal_matching.index(p_idx)].mean[p_idx] - \
-                                 arms[a_idx].mean[p_idx]
-                        regrets_one_trial[p_idx].append(regret)
-
-            self.regrets += np.cumsum(np.array(regrets_one_trial), axis=1)
-            self.two_side_market.reset(players)
-
-        self.regrets /= self.trials
+        return regret_accumulator.finish_trial()
 
     def plot_example6(self):
+        import matplotlib.pyplot as plt
+
         plt.figure(dpi=150)
 
         delta = np.linspace(0, self.horizon, 10)
-        plt.plot(delta, self.regrets[0][0:-1:int(self.horizon/10)],
+        plt.plot(delta, plot_points(self.regrets, 0, int(self.horizon/10)),
                 marker="o", color = 'blue', linewidth = 0.8, label = 'Agent 1')
-        plt.plot(delta, self.regrets[1][0:-1:int(self.horizon/10)],
+        plt.plot(delta, plot_points(self.regrets, 1, int(self.horizon/10)),
                 marker="<", color = 'dodgerblue', linewidth = 0.8, label = 'Agent 2')
-        plt.plot(delta, self.regrets[2][0:-1:int(self.horizon/10)],
+        plt.plot(delta, plot_points(self.regrets, 2, int(self.horizon/10)),
                 marker=">", color = 'lightskyblue', linewidth = 0.8, label = 'Agent 3')
 
         plt.ylabel('Expected Regret')
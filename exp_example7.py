@@ -1,17 +1,27 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
 
-from src.arm import Arm
+from src.backend import Backend_Market
+from src.convergence import stable_until_horizon
+from src.checkpoint import capture, fingerprint, restore, restore_trials
+from src.engine import Vectorized_Market
+from src.experiment import Experiment
 from src.GS import GS_Market
-from src.player import Player
+from src.progress import progress_bar
+from src.regret import Regret_Accumulator
+from src.reward import set_reward_streams
+from src.runner import Trial_Runner
+from src.sparse import Sparse_Market
+from src.state import Market_State
+from src.storage import plot_points, store_path
 
 
-class Exp_example7():
+class Exp_example7(Experiment):
     '''
         Experiments with the centralized UCB and centrailzed ETC algorithm with 20 players and 20 arms
     '''
 
+    results = ('regret_accumulator', 'regrets', 'market_state')
+
     def __init__(self):
         self.num_players = 20
         self.num_arms = 20
@@ -19,60 +29,166 @@ class Exp_example7():
         self.trials = 50
         self.arms_var = 1
         self.reward_interval = 0.1
-        
+
         self.two_side_market = GS_Market(self.num_players, self.num_arms)
 
-    def run_example7_UCB(self, optimal=True):
+    def run_example7_UCB(self, optimal=True, vectorized=False, workers=None, seed=None, checkpointer=None):
 
         # initialize players
         players_ranking = np.arange(self.num_arms)
-        players = [Player(self.num_arms, players_ranking)
-                    for i in range(self.num_players)]
+        self.market_state = Market_State(self.num_players, self.num_arms, self.dtype)
+        players = self.market_state.make_players([players_ranking] * self.num_players)
         
         # initialize arms
         arms_mean = np.linspace(0.9, 0, self.num_arms)
         arms_ranking = np.arange(self.num_players)
-        arms = [Arm(self.num_players, arms_mean[i]*np.ones(self.num_players), self.arms_var, arms_ranking) 
-                for i in range(self.num_arms)]
-
-        # collect regrets
-        self.regrets = np.zeros([self.num_players, self.horizon])
-
-        # get optimal matching
-        optimal_matching = self.two_side_market.get_optimal_matching(players, arms).tolist()
-        
-        # string = "optimal" if optimal else "pessimal"
-        for _ in tqdm(range(self.trials), ascii=True, desc="Running the example 7 centralized UCB "):
-            regrets_one_trial = [[] for i in range(self.num_players)]
-
-            for _ in range(self.horizon):
-                matching_result = self.two_side_market.match(players, arms)
-
-                for a_idx in range(self.num_arms):
-                    if matching_result[a_idx] != None:
-                        p_idx = matching_result[a_idx]
-                        regret = arms[optimal_matching.index(p_idx)].mean[p_idx] - \
-                                 arms[a_idx].mean[p_idx]
-                        regrets_one_trial[p_idx].append(regret)
-
-            self.regrets += np.cumsum(np.array(regrets_one_trial), axis=1)
-            self.two_side_market.reset(players)
-
-        self.regrets /= self.trials
+        arms = self.market_state.make_arms(arms_mean[:, None] * np.ones(self.num_players), self.arms_var,
+                                           [arms_ranking] * self.num_arms, bernoulli=self.bernoulli)
+
+        # get the optimal or the pessimal matching as the reference of the regrets
+        if optimal:
+            reference_matching = self.two_side_market.get_optimal_matching(players, arms).tolist()
+        else:
+            reference_matching = self.two_side_market.get_pessimal_matching(players, arms).tolist()
+
+        # a snapshot of this run is resumed, along with the regrets it left on disk
+        state = None
+        if checkpointer is not None:
+            state = checkpointer.load(fingerprint(self.run_settings(seed, optimal)))
+
+        # collect regrets, in the store the snapshot was taken with if any
+        resume = state is not None and 'store' in state
+        store_dir = str(state['store']) if resume else store_path(self.storage_dir, 'example7_UCB')
+        self.regret_accumulator = Regret_Accumulator.from_arms(arms, reference_matching, self.horizon,
+                                                               store_dir=store_dir, resume=resume)
+        self.fast_forward_rounds = []
+
+        # advance all trials at once with the array based engine
+        if vectorized:
+            self.check_options("The vectorized engine", players, checkpointer)
+            Vectorized_Market.from_objects(arms) \
+                .run_UCB(self.horizon, self.trials, self.regret_accumulator, seed)
+        elif self.backend is not None:
+            self.check_options("The backend " + self.backend, players, checkpointer)
+            Backend_Market.from_objects(arms, self.backend) \
+                .run_UCB(self.horizon, self.trials, self.regret_accumulator, workers, seed)
+        elif self.sparse:
+            self.check_options("The sparse engine", players, checkpointer)
+            Sparse_Market.from_objects(players, arms, self.sparse_k) \
+                .run_UCB(self.horizon, self.trials, self.regret_accumulator, workers, seed)
+        elif checkpointer is not None:
+            self.run_example7_UCB_checkpointed(players, arms, checkpointer, seed, state)
+        else:
+            # string = "optimal" if optimal else "pessimal"
+            trials = self.object_trials('run_example7_UCB_trial', players, arms, self.regret_accumulator,
+                                        workers, seed)
+            progress = progress_bar(trials, total=self.trials, ascii=True,
+                                    desc="Running the example 7 centralized UCB ")
+            for regrets_one_trial in progress:
+                self.regret_accumulator.add_trial(regrets_one_trial)
+                if self.two_side_market.stats is not None:
+                    progress.set_postfix_str(self.two_side_market.stats.summary())
+
+        self.regrets = self.regret_accumulator.regrets
+
+    def run_example7_UCB_checkpointed(self, players, arms, checkpointer, seed=None, state=None):
+        '''
+            Runs the trials in process, snapshotted by checkpointer and resumed from state
+        '''
+        first_trial = 0
+        if state is not None:
+            first_trial = int(state['trial'])
+            restore_trials(state, self.regret_accumulator)
+            # the trial of the snapshot was already added to the store, the next one starts afresh
+            if self.regret_accumulator.trials > first_trial:
+                first_trial, state = self.regret_accumulator.trials, None
+
+        seeds = None if seed is None else Trial_Runner(seed=seed).seeds(self.trials)
+        progress = progress_bar(range(first_trial, self.trials), initial=first_trial, total=self.trials,
+                                ascii=True, desc="Running the example 7 centralized UCB ")
+        for trial_idx in progress:
+            rng = None if seeds is None else np.random.Generator(np.random.PCG64(seeds[trial_idx]))
+            resume = state if trial_idx == first_trial else None
+            regrets_one_trial = self.run_example7_UCB_trial(players, arms, self.regret_accumulator, rng,
+                                                            checkpointer, trial_idx, resume)
+            self.regret_accumulator.add_trial(regrets_one_trial)
+            if self.two_side_market.stats is not None:
+                progress.set_postfix_str(self.two_side_market.stats.summary())
+
+        checkpointer.clear()
+
+    def run_settings(self, seed=None, optimal=True):
+        '''
+            Everything the regrets of run_example7_UCB depend on
+        '''
+        return {'seed': seed,
+                'optimal': optimal,
+                'num_players': self.num_players,
+                'num_arms': self.num_arms,
+                'horizon': self.horizon,
+                'trials': self.trials,
+                'arms_var': self.arms_var,
+                'bernoulli': self.bernoulli,
+                'dtype': np.dtype(self.dtype).name,
+                'reward_chunk': self.reward_chunk,
+                'reward_blocks': self.reward_blocks,
+                'reward_oracle': None if self.reward_oracle is None else self.reward_oracle.seed,
+                'fast_forward': self.fast_forward}
+
+    def run_example7_UCB_trial(self, players, arms, regret_accumulator, rng=None,
+                               checkpointer=None, trial_idx=0, resume=None):
+        '''
+            Runs a single trial and returns the cumulative regrets of the players,
+            continuing from the snapshot resume if given
+        '''
+        self.two_side_market.reset(players)
+        set_reward_streams(arms, rng, self.reward_chunk, self.reward_blocks,
+                           self.reward_oracle, trial_idx)
+
+        regret_accumulator.start_trial()
+        if resume is not None:
+            restore(resume, self.two_side_market, players, arms, regret_accumulator)
+
+        stats = self.two_side_market.stats
+        fast_forwarded = None
+        for _ in range(self.two_side_market.t, self.horizon):
+            matching_result = self.two_side_market.match(players, arms)
+            if stats is not None:
+                tic = stats.tic()
+            regret_accumulator.record(matching_result)
+            if stats is not None:
+                stats.add('regret', tic)
+
+            if checkpointer is not None and checkpointer.due(self.two_side_market.t):
+                checkpointer.save(capture(trial_idx, self.two_side_market, players, arms,
+                                          regret_accumulator))
+
+            # credit the remaining rounds at once once the matching provably stays
+            if self.fast_forward is not None and self.two_side_market.t % self.fast_forward == 0 \
+                and self.two_side_market.t < self.horizon \
+                and stable_until_horizon(self.two_side_market, players, arms, matching_result, self.horizon):
+                fast_forwarded = self.two_side_market.t
+                regret_accumulator.record(matching_result, self.horizon - fast_forwarded)
+                break
+
+        self.fast_forward_rounds.append(fast_forwarded)
+        return regret_accumulator.finish_trial()
 
     def plot_example7(self):
+        import matplotlib.pyplot as plt
+
         plt.figure(dpi=150)
 
         interval = 10
-        plt.plot(self.regrets[0][0:-1:int(self.horizon/interval)],
+        plt.plot(plot_points(self.regrets, 0, int(self.horizon/interval)),
                 marker="o", color = 'blue', linewidth = 0.8, label = 'Agent 1')
-        plt.plot(self.regrets[4][0:-1:int(self.horizon/interval)],
+        plt.plot(plot_points(self.regrets, 4, int(self.horizon/interval)),
                 marker="<", color = 'dodgerblue', linewidth = 0.8, label = 'Agent 5')
-        plt.plot(self.regrets[9][0:-1:int(self.horizon/interval)],
+        plt.plot(plot_points(self.regrets, 9, int(self.horizon/interval)),
                 marker=">", color = 'lightskyblue', linewidth = 0.8, label = 'Agent 10')
-        plt.plot(self.regrets[14][0:-1:int(self.horizon/interval)],
+        plt.plot(plot_points(self.regrets, 14, int(self.horizon/interval)),
                 marker="x", color = 'green', linewidth = 0.8, label = 'Agent 15')
-        plt.plot(self.regrets[19][0:-1:int(self.horizon/interval)],
+        plt.plot(plot_points(self.regrets, 19, int(self.horizon/interval)),
                 marker="+", color = 'r', linewidth = 0.8, label = 'Agent 20')
 
         plt.ylabel('Expected Regret')
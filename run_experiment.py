@@ -0,0 +1,73 @@
+import argparse
+import importlib
+import json
+import os
+
+import numpy as np
+
+from src import progress
+from src.profiling import Match_Stats
+
+
+# name: (module, class, run method, attributes saved as results)
+experiments = {
+    'example2': ('exp_example2', 'Exp_example2', 'run_example2_UCB', ['delta', 'regret_example2']),
+    'example6': ('exp_example6', 'Exp_example6', 'run_example6_UCB', ['regrets']),
+    'example7': ('exp_example7', 'Exp_example7', 'run_example7_UCB', ['regrets']),
+    'centralized_UCB_ETC': ('exp_centrailized_ucb_etc', 'Exp_centralized_UCB_ETC',
+                            'run_centralized_UCB_ETC', ['regrets_ucb', 'regrets_etc']),
+}
+
+
+def as_array(value):
+    '''
+        Array of a result, the curves of a list being stacked and the ones on disk read
+    '''
+    if isinstance(value, list):
+        return np.stack([np.asarray(item) for item in value])
+    return np.asarray(value)
+
+
+def run_experiment(config, output=None):
+    '''
+        Runs the experiment described by config headless and saves its results to an .npz file,
+        config holding "experiment", "init", "attributes", "run", "stats" and "output"
+    '''
+    module_name, class_name, method, results = experiments[config['experiment']]
+    cls = getattr(importlib.import_module(module_name), class_name)
+
+    exp = cls(**config.get('init', {}))
+    for name, value in config.get('attributes', {}).items():
+        if isinstance(getattr(exp, name, None), np.ndarray):
+            value = np.asarray(value)
+        setattr(exp, name, value)
+
+    stats = Match_Stats() if config.get('stats', False) else None
+    exp.two_side_market.stats = stats
+    getattr(exp, method)(**config.get('run', {}))
+
+    output = output or config.get('output') or config['experiment'] + '.npz'
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    arrays = {name: as_array(getattr(exp, name)) for name in results}
+    arrays['config'] = np.array(json.dumps(config, sort_keys=True))
+    if stats is not None:
+        arrays['stats'] = np.array(json.dumps(stats.as_dict()))
+    np.savez(output, **arrays)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs an experiment from a JSON config without plotting")
+    parser.add_argument('config', help="JSON file describing the experiment")
+    parser.add_argument('--output', help="where to write the .npz results, overrides the config")
+    parser.add_argument('--quiet', action='store_true', help="no progress bars")
+    args = parser.parse_args()
+
+    # nothing is drawn, but a figure backend must not need a display if loaded anyway
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    progress.enabled = not args.quiet
+
+    with open(args.config) as f:
+        config = json.load(f)
+    print("Results written to " + run_experiment(config, args.output))
@@ -1,6 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from pprint import pprint
+
+from src.profiling import Match_Stats
+from src.trace import Matching_Trace
 
 
 class GS_Market(object):
@@ -8,13 +9,59 @@ class GS_Market(object):
         Simulator of two side matching market with the GS algorithm
     '''
 
-    def __init__(self, num_players, num_arms):
+    # share of the players above which a repair is dropped for a plain GS
+    repair_fraction = 0.25
+
+    def __init__(self, num_players, num_arms, warm_start=False, stats=None, trace=None, backend=None):
         self.num_players = num_players
         self.num_arms = num_arms
         self.t = 0
         self.players_rankings = []
         self.arms_rankings = []
 
+        # reuse or repair the previous matching when the rankings barely change, which
+        # only pays off once the rankings settle, so the examples solve every round
+        self.warm_start = warm_start
+        self.cache_hits = 0
+        self.cache_repairs = 0
+        self.cache_misses = 0
+        self.last_players_rankings = None
+        self.last_arms_rankings = None
+        self.last_matching = None
+
+        # players and arms whose rankings are currently laid out in the matrices
+        self.ranked_players = None
+        self.ranked_arms = None
+        self.ranked_ucb = None
+        self.learners = []
+
+        # Match_Stats timing the phases of the rounds, None to skip the timing
+        self.stats = stats
+        # Matching_Trace recording the matching of every round, None to skip it
+        self.trace = trace
+        # name of the backend running GS, None for stable_matching of this module
+        self.backend = backend
+
+    def __getstate__(self):
+        # the rankings laid out and the cached matching belong to the players of this process
+        state = self.__dict__.copy()
+        state.update(players_rankings=[], arms_rankings=[], ranked_players=None, ranked_arms=None,
+                     ranked_ucb=None, learners=[], last_players_rankings=None,
+                     last_arms_rankings=None, last_matching=None)
+        return state
+
+    def trial_copy(self):
+        '''
+            Market of a trial run by a worker, with stats and trace of its own
+        '''
+        copy = object.__new__(type(self))
+        copy.__dict__.update(self.__getstate__())
+        if self.stats is not None:
+            copy.stats = Match_Stats()
+        if self.trace is not None:
+            copy.trace = Matching_Trace(self.trace.num_players, self.trace.num_arms)
+        return copy
+
     def proceed(self):
         self.t += 1
 
@@ -25,77 +72,225 @@ class GS_Market(object):
 
     def match(self, players, arms, ucb=True):
         '''
-            The return is the matching result indexed by arms and valued by players.
-            For now, we assume that the number of players and arms are the same
-            such that there will always be an arm for each player and vice versa
+            The return is the matching result indexed by arms and valued by players,
+            with -1 for the arms left unmatched when the two sides differ in size
         '''
 
+        stats = self.stats
+        if stats is not None:
+            stats.start_round()
+            tic = stats.tic()
+
         # enter a new round    
         self.proceed()
 
         # get the proposals from both sides
-        self.players_rankings = np.array([players[j].get_ranking(ucb=ucb) \
-                                            for j in range(self.num_players)], int) \
-                                                .reshape(self.num_players, self.num_arms)
-        self.arms_rankings = np.array([arms[j].get_ranking() \
-                                        for j in range(self.num_arms)], int) \
-                                            .reshape(self.num_arms, self.num_players)
+        self.build_rankings(players, arms, ucb)
+        for j in self.learners:
+            self.players_rankings[j] = players[j].get_ranking(ucb=ucb)
+        if stats is not None:
+            tic = stats.add('rankings', tic)
 
         # get the final result of matching        
         matching = self.Gale_Shapley()
+        if self.trace is not None:
+            self.trace.record(self.t, matching)
+        if stats is not None:
+            tic = stats.add('GS', tic)
 
         # update the ucb estimation
         if ucb:
-            for a_idx, p_idx in enumerate(matching):
-                reward = arms[a_idx].sample(p_idx)
+            pulls = [(a_idx, p_idx) for a_idx, p_idx in enumerate(matching.tolist()) if p_idx >= 0]
+            rewards = [arms[a_idx].sample(p_idx, self.t) for a_idx, p_idx in pulls]
+            if stats is not None:
+                tic = stats.add('sampling', tic)
+
+            for (a_idx, p_idx), reward in zip(pulls, rewards):
                 players[p_idx].update(a_idx, reward, self.t)
+            if stats is not None:
+                stats.add('update', tic)
 
         return matching
 
 
+    def build_rankings(self, players, arms, ucb):
+        '''
+            Allocates the ranking matrices once for given players and arms, the rows of the learning
+            players being rewritten in each round
+        '''
+        if self.ranked_arms is not arms:
+            self.arms_rankings = np.array([arms[j].get_ranking() \
+                                            for j in range(self.num_arms)], int) \
+                                                .reshape(self.num_arms, self.num_players)
+            self.ranked_arms = arms
+
+        if self.ranked_players is not players or self.ranked_ucb != ucb:
+            self.players_rankings = np.array([players[j].get_ranking(ucb=ucb) \
+                                                for j in range(self.num_players)], int) \
+                                                    .reshape(self.num_players, self.num_arms)
+            self.learners = [j for j in range(self.num_players) if not players[j].oracle]
+            self.ranked_players = players
+            self.ranked_ucb = ucb
+
     def get_optimal_matching(self, players, arms):
         '''
-            The optimal for each player is obtained using GS with true rankings from both sides
+            The optimal for each player is obtained using GS with true rankings from both sides,
+            once per market as the lattice of stable matchings is cached by rankings
         '''
+        return self.get_lattice(players, arms).optimal.copy()
+
+    def get_pessimal_matching(self, players, arms):
+        '''
+            The pessimal for each player is obtained using GS with true rankings where the arms propose
+        '''
+        return self.get_lattice(players, arms).pessimal.copy()
+
+    def get_lattice(self, players, arms):
+        # imported here since the lattice itself runs the GS of this module
+        from src.lattice import stable_lattice
+
         self.players_rankings = np.array([players[j].get_true_ranking() \
                                             for j in range(self.num_players)], int) \
                                                 .reshape(self.num_players, self.num_arms)
         self.arms_rankings = np.array([arms[j].get_ranking() \
                                         for j in range(self.num_arms)], int) \
                                             .reshape(self.num_arms, self.num_players)
-        return self.Gale_Shapley()
+        self.ranked_players = None
+        self.ranked_arms = None
+        return stable_lattice(self.players_rankings, self.arms_rankings)
     
 
     def Gale_Shapley(self):
-        # propose_order records the order players should follow while proposing
-        init_propose_order = np.zeros(self.num_players, int)
-        propose_order = init_propose_order
-        # matched record whether a specific player is matched or not
-        matched = np.zeros(self.num_players, bool)
-        # matching records the choice of a player for a specific arm
-        matching = [[] for _ in range(self.num_arms)]
-
-        # Terminates if all matched
-        while np.sum(matched) != self.num_players:
-
-            # plasyers propose at the same time
-            for p_idx in range(self.num_players):
-                if not matched[p_idx]:
-                    p_proposal = self.players_rankings[p_idx][propose_order[p_idx]]
-                    matching[p_proposal].append(p_idx)
-
-            # arms choose its player
-            for a_idx in range(self.num_arms):
-                a_choices = matching[a_idx]
-
-                if len(a_choices) != 0:    
-                    # each arm chooses the its most preferable one
-                    a_choice = next((x for x in self.arms_rankings[a_idx] if x in matching[a_idx]), None)
-                    # update arm's choice where there should only be one left
-                    matching[a_idx] = [a_choice]
-                    # update player's state of matched
-                    for p_idx in a_choices:
-                        matched[p_idx] = (p_idx == a_choice)
-                        propose_order[p_idx] += (1 - (p_idx == a_choice))
-    
-        return np.squeeze(matching)
+        players_rankings = np.asarray(self.players_rankings, int)
+        arms_rankings = np.asarray(self.arms_rankings, int)
+
+        if not self.warm_start:
+            return self.solve_matching(players_rankings, arms_rankings)
+
+        if self.last_matching is None \
+            or self.last_players_rankings.shape != players_rankings.shape \
+                or not np.array_equal(self.last_arms_rankings, arms_rankings):
+            self.cache_misses += 1
+            matching = self.solve_matching(players_rankings, arms_rankings)
+        else:
+            matching = self.repair_matching(players_rankings, arms_rankings)
+
+        self.last_players_rankings = players_rankings.copy()
+        self.last_arms_rankings = arms_rankings.copy()
+        self.last_matching = matching
+        return matching.copy()
+
+    def solve_matching(self, players_rankings, arms_rankings, holder=None, propose_order=None):
+        if self.backend is None:
+            return stable_matching(players_rankings, arms_rankings, holder, propose_order, self.stats)
+
+        # imported here since the backends run the GS of this module
+        from src.backend import get_backend
+        return get_backend(self.backend).stable_matching(players_rankings, arms_rankings, holder,
+                                                         propose_order, self.stats)
+
+    def repair_matching(self, players_rankings, arms_rankings):
+        '''
+            Keeps the previous matching when the prefixes GS read are unchanged, otherwise resumes GS
+            with the players and arms connected to a changed prefix reset
+        '''
+        last_rankings = self.last_players_rankings
+        last_matching = self.last_matching
+
+        changed = players_rankings != last_rankings
+        if not changed.any():
+            self.cache_hits += 1
+            return last_matching
+
+        # position of each arm in the previous rankings of the players
+        num_players, num_arms = last_rankings.shape
+        last_inverse = np.empty((num_players, num_arms), int)
+        last_inverse[np.arange(num_players)[:, None], last_rankings] = np.arange(num_arms)
+
+        # number of arms each player proposed to in the previous run
+        prefix = np.full(num_players, num_arms)
+        matched_a = np.nonzero(last_matching >= 0)[0]
+        matched_p = last_matching[matched_a]
+        prefix[matched_p] = last_inverse[matched_p, matched_a] + 1
+
+        dirty = (changed & (np.arange(num_arms) < prefix[:, None])).any(axis=1)
+        if not dirty.any():
+            self.cache_hits += 1
+            return last_matching
+
+        # spread the reset along the proposals of the previous run, each player and arm
+        # joining the frontier once, and give up once too much of the market is reset
+        limit = self.repair_fraction * num_players
+        proposed = last_inverse < prefix[:, None]
+        dirty_arms = np.zeros(num_arms, bool)
+        frontier = dirty.copy()
+        while frontier.any() and dirty.sum() <= limit:
+            new_arms = proposed[frontier].any(axis=0) & ~dirty_arms
+            dirty_arms |= new_arms
+            frontier = proposed[:, new_arms].any(axis=1) & ~dirty
+            dirty |= frontier
+
+        if dirty.sum() > limit:
+            self.cache_misses += 1
+            return self.solve_matching(players_rankings, arms_rankings)
+
+        self.cache_repairs += 1
+        holder = last_matching.copy()
+        holder[dirty_arms] = -1
+        propose_order = prefix.copy()
+        propose_order[dirty] = 0
+        return self.solve_matching(players_rankings, arms_rankings, holder, propose_order)
+
+
+def stable_matching(players_rankings, arms_rankings, holder=None, propose_order=None, stats=None):
+    '''
+        Player-proposing GS returning the matching indexed by arms and valued by players (-1 if
+        unmatched), resumed from holder and propose_order if given
+    '''
+    players_rankings = np.asarray(players_rankings, int)
+    arms_rankings = np.asarray(arms_rankings, int)
+    num_players, num_arms = len(players_rankings), len(arms_rankings)
+
+    # arms_inverse[a_idx][p_idx] is the position of player p_idx in the ranking of arm a_idx
+    arms_inverse = np.empty((num_arms, num_players), int)
+    arms_inverse[np.arange(num_arms)[:, None], arms_rankings] = np.arange(num_players)
+    arms_inverse = arms_inverse.tolist()
+    rankings = players_rankings.tolist()
+
+    # propose_order records the next position each player proposes to
+    if propose_order is None:
+        propose_order = [0] * num_players
+    else:
+        propose_order = np.asarray(propose_order, int).tolist()
+    # holder records the player currently held by each arm
+    if holder is None:
+        holder = [-1] * num_arms
+    else:
+        holder = np.asarray(holder, int).tolist()
+    # queue of the players that still have to propose
+    held = set(holder)
+    free = [p_idx for p_idx in range(num_players - 1, -1, -1) if p_idx not in held]
+    proposed = sum(propose_order) if stats is not None else 0
+
+    while free:
+        p_idx = free.pop()
+        p_ranking = rankings[p_idx]
+        if propose_order[p_idx] == len(p_ranking):
+            # rejected by every arm, stays unmatched
+            continue
+
+        a_idx = p_ranking[propose_order[p_idx]]
+        propose_order[p_idx] += 1
+
+        h_idx = holder[a_idx]
+        if h_idx < 0:
+            holder[a_idx] = p_idx
+        elif arms_inverse[a_idx][p_idx] < arms_inverse[a_idx][h_idx]:
+            holder[a_idx] = p_idx
+            free.append(h_idx)
+        else:
+            free.append(p_idx)
+
+    if stats is not None:
+        stats.count_proposals(sum(propose_order) - proposed)
+    return np.array(holder, int)
@@ -1,18 +1,66 @@
 import numpy as np
 
+from src.state import Market_State
+
 
 class Arm(object):
-    
-    def __init__(self, num_players, mean, var, ranking):
+    '''
+        View onto the row a_idx of the arm means and rankings of a Market_State,
+        the arm getting a state of its own when given none
+    '''
+
+    def __init__(self, num_players, mean, var, ranking, rng=None, bernoulli=False, state=None, a_idx=0):
         self.num_players = num_players
+        self.state = Market_State(num_players, 1, players=False) if state is None else state
+        self.a_idx = a_idx
+        self._mean = self.state.arms_mean[a_idx]
+        self._ranking = self.state.arms_rankings[a_idx]
+
         self.mean = mean
         self.var = var
         
         # for arm, the "ranking" is out of the "true reference"
         self.ranking = ranking
 
-    def sample(self, p_idx):
-        return np.random.normal(self.mean[p_idx], self.var)
+        # generator of the rewards, the global random state if None
+        self.rng = rng
+        # pre-drawn rewards served instead of the generator if set
+        self.source = None
+        # rewards in {0, 1} with probability mean of 1 instead of Gaussian ones
+        self.bernoulli = bernoulli
+        if bernoulli and (np.min(self._mean) < 0 or np.max(self._mean) > 1):
+            raise ValueError("The means of Bernoulli rewards must be in [0, 1]")
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @mean.setter
+    def mean(self, mean):
+        self._mean[:] = mean
+
+    @property
+    def ranking(self):
+        return self._ranking
+
+    @ranking.setter
+    def ranking(self, ranking):
+        self._ranking[:] = ranking
+
+    @property
+    def bounds(self):
+        '''
+            Interval containing every reward, None for Gaussian rewards which are unbounded
+        '''
+        return (0.0, 1.0) if self.bernoulli else None
+
+    def sample(self, p_idx, t=None):
+        if self.source is not None:
+            return self.source.sample(p_idx, t)
+        rng = np.random if self.rng is None else self.rng
+        if self.bernoulli:
+            return float(rng.random() < self.mean[p_idx])
+        return rng.normal(self.mean[p_idx], self.var)
     
     def get_ranking(self):
         return self.ranking
@@ -0,0 +1,291 @@
+import warnings
+from functools import partial
+
+import numpy as np
+
+from src.GS import stable_matching
+from src.reward import gaussian_arms_mean
+from src.runner import run_trials
+
+
+def make_kernels(jit):
+    '''
+        GS and a round of the centralized UCB on arrays only, compiled by jit, every backend
+        doing the same floating point operations
+    '''
+
+    def gale_shapley(players_rankings, arms_inverse, holder, propose_order):
+        '''
+            Same algorithm as stable_matching, resumed from holder and propose_order
+            which are updated in place. Returns the number of proposals made.
+        '''
+        num_players, num_arms = players_rankings.shape
+        held = np.zeros(num_players, np.bool_)
+        for a_idx in range(len(holder)):
+            if holder[a_idx] >= 0:
+                held[holder[a_idx]] = True
+
+        free = np.empty(num_players, np.int64)
+        num_free = 0
+        for p_idx in range(num_players - 1, -1, -1):
+            if not held[p_idx]:
+                free[num_free] = p_idx
+                num_free += 1
+
+        proposals = 0
+        while num_free > 0:
+            num_free -= 1
+            p_idx = free[num_free]
+            if propose_order[p_idx] == num_arms:
+                continue
+
+            a_idx = players_rankings[p_idx, propose_order[p_idx]]
+            propose_order[p_idx] += 1
+            proposals += 1
+
+            h_idx = holder[a_idx]
+            if h_idx < 0:
+                holder[a_idx] = p_idx
+            elif arms_inverse[a_idx, p_idx] < arms_inverse[a_idx, h_idx]:
+                holder[a_idx] = p_idx
+                free[num_free] = h_idx
+                num_free += 1
+            else:
+                free[num_free] = p_idx
+                num_free += 1
+        return proposals
+
+    gale_shapley = jit(gale_shapley)
+
+    def reposition(ranking, ucb, a_idx):
+        '''
+            Moves a_idx, whose ucb changed, within the ranking sorted by decreasing
+            ucb with ties broken by index, as Player.reposition does
+        '''
+        position = 0
+        while ranking[position] != a_idx:
+            position += 1
+
+        while position > 0:
+            b_idx = ranking[position - 1]
+            if ucb[b_idx] > ucb[a_idx] or (ucb[b_idx] == ucb[a_idx] and b_idx < a_idx):
+                break
+            ranking[position] = b_idx
+            position -= 1
+
+        while position + 1 < len(ranking):
+            b_idx = ranking[position + 1]
+            if ucb[b_idx] < ucb[a_idx] or (ucb[b_idx] == ucb[a_idx] and b_idx > a_idx):
+                break
+            ranking[position] = b_idx
+            position += 1
+
+        ranking[position] = a_idx
+
+    reposition = jit(reposition)
+
+    def ucb_round(count, est_mean, ucb, rankings, means, arms_inverse, var, noise, log_t, epsilon, holder):
+        '''
+            Matches the players with GS on their rankings into holder, updates the
+            pulled arms with means[p_idx, a_idx] + var * noise[k] for the k-th matched
+            arm in arm order, and moves these arms within the rankings
+        '''
+        num_players = len(rankings)
+        holder[:] = -1
+        propose_order = np.zeros(num_players, np.int64)
+        gale_shapley(rankings, arms_inverse, holder, propose_order)
+
+        k = 0
+        for a_idx in range(len(holder)):
+            p_idx = holder[a_idx]
+            if p_idx < 0:
+                continue
+            reward = means[p_idx, a_idx] + var * noise[k]
+            k += 1
+
+            # same arithmetic as Player.update
+            counts = count[p_idx, a_idx] + 1
+            mean = est_mean[p_idx, a_idx]
+            mean += (reward - mean) / counts
+            count[p_idx, a_idx] = counts
+            est_mean[p_idx, a_idx] = mean
+            ucb[p_idx, a_idx] = mean + np.sqrt(3 * log_t / (2*(counts + epsilon)))
+            reposition(rankings[p_idx], ucb[p_idx], a_idx)
+
+    return gale_shapley, jit(ucb_round)
+
+
+class Numpy_Backend(object):
+    '''
+        The pure NumPy path: stable_matching of src.GS and array updates
+    '''
+
+    name = 'numpy'
+
+    def stable_matching(self, players_rankings, arms_rankings, holder=None, propose_order=None, stats=None):
+        return stable_matching(players_rankings, arms_rankings, holder, propose_order, stats)
+
+    def ucb_round(self, count, est_mean, ucb, rankings, means, arms_rankings, arms_inverse,
+                  var, noise, log_t, epsilon):
+        matching = stable_matching(rankings, arms_rankings)
+
+        matched_a = np.nonzero(matching >= 0)[0]
+        matched_p = matching[matched_a]
+        rewards = means[matched_p, matched_a] + var * noise[:len(matched_a)]
+
+        # same arithmetic as Player.update
+        counts = count[matched_p, matched_a] + 1
+        means_hat = est_mean[matched_p, matched_a]
+        means_hat += (rewards - means_hat) / counts
+        count[matched_p, matched_a] = counts
+        est_mean[matched_p, matched_a] = means_hat
+        ucb[matched_p, matched_a] = means_hat + np.sqrt(3 * log_t / (2*(counts + epsilon)))
+        rankings[matched_p] = np.argsort(-ucb[matched_p], axis=1, kind='stable')
+        return matching
+
+
+class Numba_Backend(object):
+    '''
+        The kernels of make_kernels compiled by Numba, a round being a single call
+    '''
+
+    name = 'numba'
+
+    def __init__(self):
+        import numba
+        self.gale_shapley, self.round_kernel = make_kernels(numba.njit)
+
+    def stable_matching(self, players_rankings, arms_rankings, holder=None, propose_order=None, stats=None):
+        players_rankings = np.ascontiguousarray(players_rankings, np.int64)
+        arms_rankings = np.asarray(arms_rankings, np.int64)
+        num_players, num_arms = len(players_rankings), len(arms_rankings)
+        arms_inverse = np.empty((num_arms, num_players), np.int64)
+        arms_inverse[np.arange(num_arms)[:, None], arms_rankings] = np.arange(num_players)
+
+        holder = np.full(num_arms, -1, np.int64) if holder is None else np.array(holder, np.int64)
+        propose_order = np.zeros(num_players, np.int64) if propose_order is None \
+            else np.array(propose_order, np.int64)
+        proposals = self.gale_shapley(players_rankings.reshape(num_players, -1), arms_inverse,
+                                      holder, propose_order)
+        if stats is not None:
+            stats.count_proposals(proposals)
+        return holder
+
+    def ucb_round(self, count, est_mean, ucb, rankings, means, arms_rankings, arms_inverse,
+                  var, noise, log_t, epsilon):
+        '''
+            GS on the rankings into holder, then the update of the pulled arms with the k-th noise for
+            the k-th matched arm, moving them within the rankings
+        '''
+        holder = np.empty(len(arms_inverse), np.int64)
+        self.round_kernel(count, est_mean, ucb, rankings, means, arms_inverse, float(var), noise,
+                          float(log_t), epsilon, holder)
+        return holder
+
+
+def check_options(engine, players, stats=None, checkpointer=None, **options):
+    '''
+        Raises a ValueError naming what engine, an array based simulator, would silently ignore
+    '''
+    ignored = [name for name, value in sorted(options.items()) if value is not None]
+    if players and players[0].state.dtype != np.float64:
+        ignored.append('dtype ' + players[0].state.dtype.name)
+    if any(player.oracle for player in players):
+        ignored.append('oracle players')
+    if stats is not None:
+        ignored.append('stats')
+    if checkpointer is not None:
+        ignored.append('checkpointer')
+    if ignored:
+        raise ValueError(engine + " does not support " + ", ".join(ignored))
+
+
+# backends already built, the Numba one compiling its kernels on first use
+backends = {}
+
+
+def get_backend(name='numpy'):
+    '''
+        Backend by name, 'numpy', 'numba', or 'auto' for Numba when it is installed.
+        Asking for Numba without it installed falls back to NumPy with a warning.
+    '''
+    if name == 'auto':
+        try:
+            import numba
+            name = 'numba'
+        except ImportError:
+            name = 'numpy'
+
+    if name not in backends:
+        if name == 'numpy':
+            backends[name] = Numpy_Backend()
+        elif name == 'numba':
+            try:
+                backends[name] = Numba_Backend()
+            except ImportError:
+                warnings.warn("Numba is not installed, falling back to the numpy backend")
+                backends[name] = get_backend('numpy')
+        else:
+            raise ValueError("Unknown backend " + repr(name))
+    return backends[name]
+
+
+class Backend_Market(object):
+    '''
+        Simulator of the centralized UCB on (players, arms) arrays, each round run by a backend
+    '''
+
+    def __init__(self, arms_mean, arms_var, arms_rankings, backend='numpy'):
+        # arms_mean[a_idx][p_idx] is the mean reward of arm a_idx for player p_idx
+        self.arms_mean = np.asarray(arms_mean, float)
+        self.means = np.ascontiguousarray(self.arms_mean.T)
+        self.arms_var = arms_var
+        self.arms_rankings = np.asarray(arms_rankings, np.int64)
+        self.num_arms, self.num_players = self.arms_mean.shape
+        self.epsilon = 10**(-10)
+
+        # arms_inverse[a_idx][p_idx] is the position of player p_idx in the ranking of arm a_idx
+        self.arms_inverse = np.empty((self.num_arms, self.num_players), np.int64)
+        self.arms_inverse[np.arange(self.num_arms)[:, None], self.arms_rankings] = np.arange(self.num_players)
+
+        # kept by name so that the market can be sent to other processes
+        self.backend = backend
+
+    @classmethod
+    def from_objects(cls, arms, backend='numpy'):
+        return cls(gaussian_arms_mean(arms), arms[0].var,
+                   [arm.get_ranking() for arm in arms], backend)
+
+    def run_UCB(self, horizon, trials, regret_accumulator, workers=None, seed=None):
+        '''
+            Folds the cumulative regrets of every trial into regret_accumulator, in
+            trial order, and returns their mean
+        '''
+        trial = partial(self.run_UCB_trial, horizon, regret_accumulator.trial_accumulator(workers))
+        for curve in run_trials(trial, trials, workers, seed):
+            regret_accumulator.add_trial(curve)
+        return regret_accumulator.mean
+
+    def run_UCB_trial(self, horizon, regret_accumulator, rng=None, trial_idx=0):
+        '''
+            Runs a single trial and returns the cumulative regrets of the players
+        '''
+        rng = np.random if rng is None else rng
+        backend = get_backend(self.backend)
+        regret_accumulator.start_trial()
+
+        count = np.zeros((self.num_players, self.num_arms))
+        est_mean = np.zeros((self.num_players, self.num_arms))
+        ucb = np.ones((self.num_players, self.num_arms)) * np.inf
+        # arms sorted by decreasing ucb with ties broken by index, kept up to date by the rounds
+        rankings = np.tile(np.arange(self.num_arms, dtype=np.int64), (self.num_players, 1))
+        num_matched = min(self.num_players, self.num_arms)
+
+        for t in range(1, horizon + 1):
+            noise = rng.standard_normal(num_matched)
+            matching = backend.ucb_round(count, est_mean, ucb, rankings, self.means, self.arms_rankings,
+                                         self.arms_inverse, self.arms_var, noise, np.log(t), self.epsilon)
+            regret_accumulator.record(matching)
+
+        return regret_accumulator.finish_trial()
+
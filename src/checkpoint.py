@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+
+
+class Checkpointer(object):
+    '''
+        Periodic snapshots of a running simulation written by a background thread, keyed by
+        the fingerprint of the run
+    '''
+
+    def __init__(self, path, interval=1000):
+        self.path = path
+        self.interval = interval
+        self.writer = None
+        self.fingerprint = None
+
+    def due(self, t):
+        return t % self.interval == 0
+
+    def save(self, state):
+        if self.fingerprint is not None:
+            state['fingerprint'] = np.array(self.fingerprint)
+        self.wait()
+        self.writer = threading.Thread(target=self.write, args=(state,))
+        self.writer.start()
+
+    def write(self, state):
+        with open(self.path + '.tmp', 'wb') as f:
+            np.savez_compressed(f, **state)
+        os.replace(self.path + '.tmp', self.path)
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def load(self, fingerprint=None):
+        '''
+            Last snapshot, None if there is none. With fingerprint the snapshot must
+            carry the same one, and the snapshots saved from now on carry it.
+        '''
+        self.wait()
+        self.fingerprint = fingerprint
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as snapshot:
+            state = {name: snapshot[name] for name in snapshot.files}
+
+        found = str(state['fingerprint']) if 'fingerprint' in state else None
+        if fingerprint is not None and found != fingerprint:
+            raise ValueError(self.path + " is a snapshot of another run, clear it to start this one")
+        return state
+
+    def clear(self):
+        self.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def fingerprint(config):
+    '''
+        Hash of the settings a run depends on, given as a dict of JSON values
+    '''
+    text = json.dumps(config, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def capture(trial, market, players, arms, regret_accumulator):
+    '''
+        Copies everything a trial needs to continue exactly where it is
+    '''
+    rng = arms[0].rng
+    rng_state = np.random.get_state() if rng is None else rng.bit_generator.state
+    sources = [arm.source for arm in arms]
+
+    state = {'trial': np.array(trial),
+             't': np.array(market.t),
+             'count': np.array([player.count for player in players]),
+             'est_mean': np.array([player.est_mean for player in players]),
+             'ucb': np.array([player.ucb for player in players]),
+             'trials': np.array(regret_accumulator.trials),
+             'acc_t': np.array(regret_accumulator.t),
+             'next_point': np.array(regret_accumulator.next_point),
+             'cumulative': regret_accumulator.cumulative.copy(),
+             'curve': regret_accumulator.curve.copy(),
+             'random': np.frombuffer(pickle.dumps((rng_state, sources)), np.uint8)}
+
+    # regrets on disk are flushed and found again from their path rather than copied
+    if regret_accumulator.store is None:
+        state['mean'] = regret_accumulator.mean.copy()
+        state['m2'] = regret_accumulator.m2.copy()
+    else:
+        regret_accumulator.store.flush()
+        state['store'] = np.array(regret_accumulator.store.directory)
+    return state
+
+
+def restore_trials(state, regret_accumulator):
+    '''
+        Restores the regrets of the trials already finished, which a Regret_Store opened with
+        resume holds already
+    '''
+    if 'store' in state:
+        if regret_accumulator.store is None or regret_accumulator.store.trials < int(state['trials']):
+            raise ValueError("The regrets of the snapshot are not in the store " + str(state['store']))
+        regret_accumulator.trials = regret_accumulator.store.trials
+        return
+
+    regret_accumulator.trials = int(state['trials'])
+    regret_accumulator.mean[:] = state['mean']
+    regret_accumulator.m2[:] = state['m2']
+
+
+def restore(state, market, players, arms, regret_accumulator):
+    '''
+        Puts back a trial captured by capture, the arms being already set up for it
+    '''
+    market.t = int(state['t'])
+    for j, player in enumerate(players):
+        player.count = state['count'][j]
+        player.est_mean = state['est_mean'][j]
+        player.ucb = state['ucb'][j]
+
+    restore_trials(state, regret_accumulator)
+    regret_accumulator.t = int(state['acc_t'])
+    regret_accumulator.next_point = int(state['next_point'])
+    regret_accumulator.cumulative[:] = state['cumulative']
+    regret_accumulator.curve[:] = state['curve']
+
+    rng_state, sources = pickle.loads(state['random'].tobytes())
+    if arms[0].rng is None:
+        np.random.set_state(rng_state)
+    else:
+        arms[0].rng.bit_generator.state = rng_state
+    for arm, source in zip(arms, sources):
+        arm.source = source
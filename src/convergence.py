@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def stable_until_horizon(market, players, arms, matching, horizon, slack=None):
+    '''
+        Proves that the matching of the last round is repeated until horizon, the ucb of each
+        matched arm staying between its neighbours for any bounded rewards
+    '''
+    remaining = horizon - market.t
+    if remaining <= 0:
+        return True
+    if any(getattr(arm, 'bounds', None) is None for arm in arms):
+        return False
+
+    # by default the rounding error the players can accumulate over horizon updates
+    if slack is None:
+        slack = np.finfo(players[0].state.dtype).eps * horizon
+    pulls = np.arange(remaining + 1)
+    rounds = market.t + np.maximum(pulls, 1)
+
+    for a_idx, p_idx in enumerate(matching):
+        if p_idx < 0 or players[p_idx].oracle:
+            continue
+        player = players[p_idx]
+        low, high = arms[a_idx].bounds
+
+        # neighbours of a_idx in the ranking used for the last matching
+        ranking = list(market.players_rankings[p_idx])
+        position = ranking.index(a_idx)
+        above = player.ucb[ranking[position-1]] if position > 0 else np.inf
+        below = player.ucb[ranking[position+1]] if position + 1 < len(ranking) else -np.inf
+
+        count = player.count[a_idx]
+        total = count * player.est_mean[a_idx]
+        bonus = np.sqrt(3 * np.log(rounds) / (2*(count + pulls + player.epsilon)))
+        upper = (total + pulls * high) / (count + pulls) + bonus
+        lower = (total + pulls * low) / (count + pulls) + bonus
+
+        # the current ucb is part of the trajectory
+        upper[0] = lower[0] = player.ucb[a_idx]
+
+        # the rounding error grows with the magnitude of the rewards
+        tolerance = slack * (1 + max(abs(low), abs(high)))
+        if upper.max() + tolerance >= above or lower.min() - tolerance <= below:
+            return False
+
+    return True
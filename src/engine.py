@@ -0,0 +1,183 @@
+import numpy as np
+
+from src.reward import gaussian_arms_mean
+from src.runner import Trial_Runner
+
+
+def batched_Gale_Shapley(players_rankings, arms_rankings):
+    '''
+        GS on many markets sharing the arms' side at once, the return being indexed by
+        (trial, arm) and valued by players (-1 if unmatched)
+    '''
+    trials, num_players, num_arms = players_rankings.shape
+
+    # arms_inverse[a_idx, p_idx] is the position of player p_idx in the ranking of arm a_idx
+    arms_inverse = np.empty((num_arms, num_players), int)
+    arms_inverse[np.arange(num_arms)[:, None], arms_rankings] = np.arange(num_players)
+
+    propose_order = np.zeros((trials, num_players), int)
+    holder = np.full((trials, num_arms), -1)
+    holder_rank = np.full((trials, num_arms), num_players)
+
+    free_t, free_p = np.nonzero(np.ones((trials, num_players), bool))
+    while free_t.size != 0:
+        proposals = players_rankings[free_t, free_p, propose_order[free_t, free_p]]
+        ranks = arms_inverse[proposals, free_p]
+
+        # each arm keeps the best among its holder and the new proposals
+        best_rank = holder_rank.copy()
+        np.minimum.at(best_rank, (free_t, proposals), ranks)
+        accepted = ranks == best_rank[free_t, proposals]
+
+        # holders beaten by a new proposal become free again
+        beaten_t, beaten_a = np.nonzero((best_rank < holder_rank) & (holder >= 0))
+        beaten_p = holder[beaten_t, beaten_a]
+
+        holder[free_t[accepted], proposals[accepted]] = free_p[accepted]
+        holder_rank = best_rank
+
+        free_t = np.concatenate([free_t[~accepted], beaten_t])
+        free_p = np.concatenate([free_p[~accepted], beaten_p])
+        propose_order[free_t, free_p] += 1
+
+        # players who have proposed to every arm stay unmatched
+        active = propose_order[free_t, free_p] < num_arms
+        free_t, free_p = free_t[active], free_p[active]
+
+    return holder
+
+
+def trials_noise(trials, shape, seed=None):
+    '''
+        Standard normal noise of shape for each trial, drawn from the global random
+        state or from the generator of each trial spawned from seed by Trial_Runner
+    '''
+    if seed is None:
+        return np.random.standard_normal((trials,) + shape)
+    return np.stack([np.random.Generator(np.random.PCG64(trial_seed)).standard_normal(shape)
+                     for trial_seed in Trial_Runner(seed=seed).seeds(trials)])
+
+
+class Vectorized_Market(object):
+    '''
+        Simulator of the centralized UCB advancing all trials in lockstep on (trials, players, arms) arrays
+    '''
+
+    def __init__(self, arms_mean, arms_var, arms_rankings):
+        # arms_mean[a_idx][p_idx] is the mean reward of arm a_idx for player p_idx
+        self.arms_mean = np.asarray(arms_mean, float)
+        self.arms_var = arms_var
+        self.arms_rankings = np.asarray(arms_rankings, int)
+        self.num_arms, self.num_players = self.arms_mean.shape
+        self.epsilon = 10**(-10)
+
+    @classmethod
+    def from_objects(cls, arms):
+        return cls(gaussian_arms_mean(arms), arms[0].var,
+                   [arm.get_ranking() for arm in arms])
+
+    def run_UCB(self, horizon, trials, regret_accumulator, seed=None):
+        '''
+            Folds the cumulative regrets of every trial into regret_accumulator and returns their mean,
+            the same as GS_Market.match for square markets
+        '''
+        optimal_mean = regret_accumulator.optimal_mean
+        checkpoints = regret_accumulator.checkpoints
+
+        count = np.zeros((trials, self.num_players, self.num_arms))
+        est_mean = np.zeros((trials, self.num_players, self.num_arms))
+        ucb = np.ones((trials, self.num_players, self.num_arms)) * np.inf
+
+        noise = trials_noise(trials, (horizon, self.num_arms), seed)
+        cumulative = np.zeros((trials, self.num_players))
+        curves = np.zeros((trials, self.num_players, len(checkpoints)))
+        next_point = 0
+
+        for t in range(1, horizon + 1):
+            players_rankings = np.argsort(-ucb, axis=2, kind='stable')
+            matching = batched_Gale_Shapley(players_rankings, self.arms_rankings)
+
+            matched_t, matched_a = np.nonzero(matching >= 0)
+            matched_p = matching[matched_t, matched_a]
+            means = self.arms_mean[matched_a, matched_p]
+            rewards = means + self.arms_var * noise[matched_t, t - 1, matched_a]
+
+            # same arithmetic as Player.update
+            counts = count[matched_t, matched_p, matched_a] + 1
+            means_hat = est_mean[matched_t, matched_p, matched_a]
+            means_hat += (rewards - means_hat) / counts
+            count[matched_t, matched_p, matched_a] = counts
+            est_mean[matched_t, matched_p, matched_a] = means_hat
+            ucb[matched_t, matched_p, matched_a] = means_hat + \
+                np.sqrt(3 * np.log(t) / (2*(counts + self.epsilon)))
+
+            # same arithmetic as Regret_Accumulator.record
+            regret = np.tile(optimal_mean, (trials, 1))
+            regret[matched_t, matched_p] -= means
+            cumulative += regret
+            if next_point < len(checkpoints) and checkpoints[next_point] == t:
+                curves[:, :, next_point] = cumulative
+                next_point += 1
+
+        for curve in curves:
+            regret_accumulator.add_trial(curve)
+        return regret_accumulator.mean
+
+    def run_ETC(self, horizon, trials, explore_rounds, regret_accumulators, seed=None):
+        '''
+            Centralized ETC for every exploration length in explore_rounds from one shared stream
+            of exploration rewards, returning the mean regrets of each
+        '''
+        num_players, num_arms = self.num_players, self.num_arms
+        players_idx = np.arange(num_players)
+
+        explore_lengths = [min(h * num_arms, horizon) for h in explore_rounds]
+        max_h = -(-max(explore_lengths) // num_arms)
+
+        # arm pulled by each player in each exploration round, each arm h times after h * num_arms rounds
+        pulled = (np.arange(max_h * num_arms)[:, None] + players_idx) % num_arms
+        pulled_mean = self.arms_mean[pulled, players_idx]
+
+        noise = trials_noise(trials, (max(explore_lengths), num_players), seed)
+        rewards = np.zeros((trials, max_h * num_arms, num_players))
+        rewards[:, :noise.shape[1]] = pulled_mean[:noise.shape[1]] + self.arms_var * noise
+
+        # sums[:, k, j, p_idx] is the total reward of the first k + 1 pulls of arm (j + p_idx) % num_arms
+        sums = np.cumsum(rewards.reshape(trials, max_h, num_arms, num_players), axis=1)
+        offsets = (np.arange(num_arms)[None, :] - players_idx[:, None]) % num_arms
+
+        means = []
+        for explore_length, regret_accumulator in zip(explore_lengths, regret_accumulators):
+            optimal_mean = regret_accumulator.optimal_mean
+            checkpoints = regret_accumulator.checkpoints
+            # explore_cumulative[t] is the regret after t rounds of exploration, 0 for none
+            explore_cumulative = np.zeros((explore_length + 1, num_players))
+            np.cumsum(optimal_mean - pulled_mean[:explore_length], axis=0, out=explore_cumulative[1:])
+
+            curves = np.zeros((trials, num_players, len(checkpoints)))
+            exploring = checkpoints <= explore_length
+            curves[:, :, exploring] = explore_cumulative[checkpoints[exploring]].T
+
+            if explore_length < horizon:
+                # commit to the matching of the estimated means, all 0 without exploration
+                h = explore_length // num_arms
+                if h == 0:
+                    est_mean = np.zeros((trials, num_players, num_arms))
+                else:
+                    est_mean = sums[:, h - 1][:, offsets, players_idx[:, None]] / h
+                players_rankings = np.argsort(-est_mean, axis=2, kind='stable')
+                matching = batched_Gale_Shapley(players_rankings, self.arms_rankings)
+
+                regret = np.tile(optimal_mean, (trials, 1))
+                matched_t, matched_a = np.nonzero(matching >= 0)
+                matched_p = matching[matched_t, matched_a]
+                regret[matched_t, matched_p] -= self.arms_mean[matched_a, matched_p]
+
+                committed = checkpoints[~exploring] - explore_length
+                curves[:, :, ~exploring] = explore_cumulative[-1][None, :, None] + \
+                    regret[:, :, None] * committed
+
+            for curve in curves:
+                regret_accumulator.add_trial(curve)
+            means.append(regret_accumulator.mean)
+        return means
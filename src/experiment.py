@@ -0,0 +1,113 @@
+import numpy as np
+from functools import partial
+
+from src.backend import check_options
+from src.runner import run_trials
+from src.state import Market_State
+
+
+class Worker_Trial(object):
+    '''
+        Trial sent to a worker, which rebuilds the players, the arms and an accumulator of its own
+    '''
+
+    def __init__(self, experiment, method, args, players, arms, regret_accumulator):
+        self.experiment = experiment.settings_copy()
+        self.method = method
+        self.args = args
+
+        self.dtype = players[0].state.dtype
+        self.players_rankings = [player.get_true_ranking() for player in players]
+        self.oracles = [player.oracle for player in players]
+        self.arms_mean = np.array([arm.mean for arm in arms])
+        self.arms_var = [arm.var for arm in arms]
+        self.arms_rankings = [arm.get_ranking() for arm in arms]
+        self.bernoulli = any(arm.bernoulli for arm in arms)
+        self.regret_accumulator = regret_accumulator.trial_copy()
+
+    def __call__(self, rng=None, trial_idx=0):
+        state = Market_State(len(self.players_rankings), len(self.arms_rankings), self.dtype)
+        players = state.make_players(self.players_rankings, self.oracles)
+        arms = state.make_arms(self.arms_mean, self.arms_var[0], self.arms_rankings, bernoulli=self.bernoulli)
+        for arm, var in zip(arms, self.arms_var):
+            arm.var = var
+
+        trial = getattr(self.experiment, self.method)
+        curve = trial(*self.args, players, arms, self.regret_accumulator, rng, trial_idx=trial_idx)
+        return curve, self.experiment.trial_results()
+
+
+class Experiment(object):
+    '''
+        Base of the experiments, running their trials on the players and arms
+    '''
+
+    # attributes holding results or the market, left out of the copies sent to workers
+    results = ()
+
+    # Bernoulli rewards in {0, 1} instead of Gaussian ones
+    bernoulli = False
+    # precision of the market state, np.float32 halves its memory
+    dtype = float
+    # rounds of rewards pre-drawn per block and blocks kept, None draws every reward on its own
+    reward_chunk = None
+    reward_blocks = None
+    # Philox_Reward_Oracle shared by every algorithm, None uses the generators
+    reward_oracle = None
+    # rounds between the checks for a matching stable until the horizon, None never checks
+    fast_forward = None
+    # round at which each trial of the last run was fast-forwarded, None if it was not
+    fast_forward_rounds = ()
+    # directory of the regrets kept on disk, None keeps them in memory
+    storage_dir = None
+    # backend running the rounds on arrays, 'numpy' or 'numba', None runs them on the objects
+    backend = None
+    # run the rounds with Sparse_Market, on lists of sparse_k arms, None listing them all
+    sparse = False
+    sparse_k = None
+
+    def settings_copy(self):
+        copy = object.__new__(type(self))
+        copy.__dict__.update((name, value) for name, value in self.__dict__.items()
+                             if name not in self.results)
+        copy.two_side_market = self.two_side_market.trial_copy()
+        copy.fast_forward_rounds = []
+        return copy
+
+    def check_options(self, engine, players, checkpointer=None):
+        check_options(engine, players, self.two_side_market.stats, checkpointer,
+                      reward_chunk=self.reward_chunk, reward_blocks=self.reward_blocks,
+                      reward_oracle=self.reward_oracle, fast_forward=self.fast_forward)
+
+    def trial_results(self):
+        '''
+            What a trial run by a worker collected besides its regrets
+        '''
+        return {'stats': self.two_side_market.stats,
+                'trace': self.two_side_market.trace,
+                'fast_forward_rounds': self.fast_forward_rounds}
+
+    def add_trial_results(self, results):
+        if results['stats'] is not None:
+            self.two_side_market.stats.merge(results['stats'])
+        if results['trace'] is not None:
+            self.two_side_market.trace.extend(results['trace'])
+        if results['fast_forward_rounds']:
+            self.fast_forward_rounds.extend(results['fast_forward_rounds'])
+
+    def object_trials(self, method, players, arms, regret_accumulator, workers=None, seed=None, args=()):
+        '''
+            Curves of the trials of method in trial order, the other results of trials run by workers
+            being added to the experiment
+        '''
+        if workers is None or workers <= 1:
+            trial = partial(getattr(self, method), *args, players, arms, regret_accumulator)
+            return run_trials(trial, self.trials, workers, seed)
+
+        trial = Worker_Trial(self, method, args, players, arms, regret_accumulator)
+        return self.worker_curves(run_trials(trial, self.trials, workers, seed))
+
+    def worker_curves(self, worker_trials):
+        for curve, results in worker_trials:
+            self.add_trial_results(results)
+            yield curve
@@ -0,0 +1,131 @@
+import hashlib
+
+import numpy as np
+
+from src.GS import stable_matching
+
+
+def player_pessimal_matching(players_rankings, arms_rankings):
+    '''
+        Arm-proposing Gale-Shapley, which yields the stable matching the worst for
+        every player, indexed by arms and valued by players (-1 if unmatched)
+    '''
+    arms_matching = stable_matching(arms_rankings, players_rankings)
+    matching = np.full(len(arms_rankings), -1)
+    matched = np.nonzero(arms_matching >= 0)[0]
+    matching[arms_matching[matched]] = matched
+    return matching
+
+
+class Stable_Lattice(object):
+    '''
+        Stable matchings of a market between the player-optimal and player-pessimal ones,
+        found by eliminating rotations (Gusfield and Irving, 1989)
+    '''
+
+    def __init__(self, players_rankings, arms_rankings):
+        self.players_rankings = np.asarray(players_rankings, int)
+        self.arms_rankings = np.asarray(arms_rankings, int)
+        self.num_players, self.num_arms = len(self.players_rankings), len(self.arms_rankings)
+
+        # arms_inverse[a_idx][p_idx] is the position of player p_idx in the ranking of arm a_idx
+        self.arms_inverse = np.empty((self.num_arms, self.num_players), int)
+        self.arms_inverse[np.arange(self.num_arms)[:, None], self.arms_rankings] = np.arange(self.num_players)
+
+        self.optimal = stable_matching(self.players_rankings, self.arms_rankings)
+        self.pessimal = player_pessimal_matching(self.players_rankings, self.arms_rankings)
+        self.matchings = None
+
+    def exposed_rotations(self, matching):
+        '''
+            Rotations exposed in the stable matching, lists of (player, arm) pairs where every
+            player moves to the arm of the next pair
+        '''
+        partner = np.full(self.num_players, -1)
+        matched = np.nonzero(matching >= 0)[0]
+        partner[matching[matched]] = matched
+
+        # next_arm[p_idx] is the first arm after its partner that prefers p_idx to its own partner
+        next_arm = {}
+        for p_idx in matching[matched].tolist():
+            ranking = self.players_rankings[p_idx].tolist()
+            for a_idx in ranking[ranking.index(partner[p_idx]) + 1:]:
+                holder = matching[a_idx]
+                if holder < 0:
+                    # an unmatched arm would take p_idx, so p_idx cannot move past it
+                    break
+                if self.arms_inverse[a_idx, p_idx] < self.arms_inverse[a_idx, holder]:
+                    next_arm[p_idx] = a_idx
+                    break
+
+        # every player has at most one successor, so the rotations are the cycles of this graph
+        rotations = []
+        visited = set()
+        for start in next_arm:
+            path = []
+            p_idx = start
+            while p_idx in next_arm and p_idx not in visited:
+                visited.add(p_idx)
+                path.append(p_idx)
+                p_idx = matching[next_arm[p_idx]]
+            if p_idx in path:
+                cycle = path[path.index(p_idx):]
+                rotations.append([(q_idx, partner[q_idx]) for q_idx in cycle])
+        return rotations
+
+    def eliminate(self, matching, rotation):
+        '''
+            Stable matching where every player of the rotation moves to the arm of
+            the next pair
+        '''
+        matching = matching.copy()
+        for j, (p_idx, _) in enumerate(rotation):
+            matching[rotation[(j + 1) % len(rotation)][1]] = p_idx
+        return matching
+
+    def all_matchings(self, limit=None):
+        '''
+            Every stable matching reached through the exposed rotations, limit stopping the search early
+        '''
+        if self.matchings is not None:
+            return self.matchings[:limit]
+
+        found = {self.optimal.tobytes(): self.optimal}
+        stack = [self.optimal]
+        while stack and (limit is None or len(found) < limit):
+            matching = stack.pop()
+            for rotation in self.exposed_rotations(matching):
+                successor = self.eliminate(matching, rotation)
+                key = successor.tobytes()
+                if key not in found:
+                    found[key] = successor
+                    stack.append(successor)
+
+        matchings = list(found.values())
+        if not stack:
+            self.matchings = matchings
+        return matchings[:limit]
+
+
+# lattices already built, keyed by the hash of the rankings
+lattice_cache = {}
+
+
+def rankings_key(players_rankings, arms_rankings):
+    digest = hashlib.sha256()
+    for rankings in (players_rankings, arms_rankings):
+        rankings = np.ascontiguousarray(rankings, np.int64)
+        digest.update(str(rankings.shape).encode())
+        digest.update(rankings.tobytes())
+    return digest.hexdigest()
+
+
+def stable_lattice(players_rankings, arms_rankings):
+    '''
+        Stable_Lattice of the market, built once per pair of ranking matrices such
+        that experiments and sweeps over the same market share it
+    '''
+    key = rankings_key(players_rankings, arms_rankings)
+    if key not in lattice_cache:
+        lattice_cache[key] = Stable_Lattice(players_rankings, arms_rankings)
+    return lattice_cache[key]
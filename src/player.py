@@ -1,25 +1,112 @@
 import numpy as np
+from bisect import bisect_left, bisect_right
+from math import sqrt
 from random import shuffle
 
+from src.state import Market_State
+
 
 class Player(object):
+    '''
+        View onto the row p_idx of the player statistics of a Market_State, the
+        player getting a state of its own when given none
+    '''
 
-    def __init__(self, num_arms, true_ranking, oracle=False):
+    def __init__(self, num_arms, true_ranking, oracle=False, state=None, p_idx=0):
         self.num_arms = num_arms
         self.true_ranking = true_ranking
-        self.oracle = oracle    
+        self.oracle = oracle
         self.epsilon = 10**(-10)
-        self.reset()    
+
+        self.state = Market_State(1, num_arms, arms=False) if state is None else state
+        self.p_idx = p_idx
+        self._count = self.state.count[p_idx]
+        self._est_mean = self.state.est_mean[p_idx]
+        self._ucb = self.state.ucb[p_idx]
+        self.order = self.state.order[p_idx]
+        self.ranked = self.state.ranked[p_idx]
+        self.reset()
 
     def reset(self):
-        self.count = np.zeros(self.num_arms)
-        self.est_mean = np.zeros(self.num_arms)
-        self.ucb = np.ones(self.num_arms) * np.inf
+        self._count[:] = 0
+        self._est_mean[:] = 0
+        self._ucb[:] = np.inf
+        self.order[:] = np.arange(self.num_arms)
+        self.ranked[:] = -np.inf
+
+    @property
+    def count(self):
+        return self._count
+
+    @count.setter
+    def count(self, count):
+        self._count[:] = count
+
+    @property
+    def est_mean(self):
+        return self._est_mean
+
+    @est_mean.setter
+    def est_mean(self, est_mean):
+        self._est_mean[:] = est_mean
+
+    @property
+    def ucb(self):
+        return self._ucb
+
+    @ucb.setter
+    def ucb(self, ucb):
+        '''
+            The arms are kept sorted by decreasing ucb (ties broken by index) in order,
+            with their sort keys -ucb in ranked
+        '''
+        self._ucb[:] = ucb
+        self.order[:] = np.argsort(-self._ucb, kind='stable')
+        self.ranked[:] = -self._ucb[self.order]
 
     def update(self, a_idx, reward, t):
-        self.count[a_idx] += 1
-        self.est_mean[a_idx] += (reward-self.est_mean[a_idx]) / self.count[a_idx]
-        self.ucb[a_idx] = self.est_mean[a_idx] + np.sqrt(3 * np.log(t) / (2*(self.count[a_idx] + self.epsilon)))
+        old_key = -self._ucb.item(a_idx)
+
+        # computed on Python floats, the same double precision operations as on the arrays
+        count = self._count.item(a_idx) + 1
+        est_mean = self._est_mean.item(a_idx)
+        est_mean += (reward-est_mean) / count
+        self._count[a_idx] = count
+        self._est_mean[a_idx] = est_mean
+        self._ucb[a_idx] = est_mean + sqrt(3 * np.log(t) / (2*(count + self.epsilon)))
+        self.reposition(a_idx, old_key, -self._ucb.item(a_idx))
+
+    def reposition(self, a_idx, old_key, new_key):
+        '''
+            Moves a_idx within the sorted order instead of sorting all the arms again
+        '''
+        ranked = self.ranked
+        order = self.order
+
+        src = bisect_left(ranked, old_key)
+        if order.item(src) != a_idx:
+            end = bisect_right(ranked, old_key, src)
+            src += bisect_left(order[src:end], a_idx)
+
+        # search the side a_idx moves to, where it is not
+        if new_key > old_key:
+            lo, hi = src + 1, len(order)
+        else:
+            lo, hi = 0, src
+        dst = bisect_left(ranked, new_key, lo, hi)
+        while dst < hi and ranked.item(dst) == new_key and order.item(dst) < a_idx:
+            dst += 1
+        if new_key > old_key:
+            dst -= 1
+
+        if src < dst:
+            order[src:dst] = order[src+1:dst+1]
+            ranked[src:dst] = ranked[src+1:dst+1]
+        elif dst < src:
+            order[dst+1:src+1] = order[dst:src]
+            ranked[dst+1:src+1] = ranked[dst:src]
+        order[dst] = a_idx
+        ranked[dst] = new_key
 
     def get_true_ranking(self):
         return self.true_ranking
@@ -29,6 +116,6 @@ class Player(object):
             return self.get_true_ranking()
 
         if ucb:
-            return np.argsort(-self.ucb)
+            return self.order
         else:
-            return np.argsort(-self.est_mean)
+            return np.argsort(-self.est_mean, kind='stable')
@@ -0,0 +1,86 @@
+import time
+
+
+class Match_Stats(object):
+    '''
+        Wall time of the phases of the rounds, proposals of GS and round throughput
+    '''
+
+    phases = ['rankings', 'GS', 'sampling', 'update', 'regret']
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.seconds = {phase: 0.0 for phase in self.phases}
+        self.rounds = 0
+        self.proposals = 0
+        self.max_proposals = 0
+        self.start = None
+        self.round_proposals = 0
+
+    def tic(self):
+        return time.perf_counter()
+
+    def add(self, phase, since):
+        '''
+            Adds the time elapsed since since to phase and returns the current time,
+            which starts the next phase
+        '''
+        now = time.perf_counter()
+        self.seconds[phase] += now - since
+        return now
+
+    def start_round(self):
+        if self.start is None:
+            self.start = time.perf_counter()
+        self.rounds += 1
+        self.round_proposals = 0
+
+    def count_proposals(self, proposals):
+        self.proposals += proposals
+        self.round_proposals += proposals
+        self.max_proposals = max(self.max_proposals, self.round_proposals)
+
+    def merge(self, other):
+        '''
+            Adds the counts of other, the stats of a trial run by a worker. Without
+            rounds of its own the wall time starts with the run time of that trial.
+        '''
+        if self.start is None:
+            self.start = time.perf_counter() - sum(other.seconds.values())
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] += seconds
+        self.rounds += other.rounds
+        self.proposals += other.proposals
+        self.max_proposals = max(self.max_proposals, other.max_proposals)
+
+    @property
+    def elapsed(self):
+        return 0.0 if self.start is None else time.perf_counter() - self.start
+
+    @property
+    def throughput(self):
+        '''
+            Rounds per second of wall time since the first round
+        '''
+        elapsed = self.elapsed
+        return self.rounds / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {'seconds': dict(self.seconds),
+                'rounds': self.rounds,
+                'proposals': self.proposals,
+                'proposals_per_round': self.proposals / max(self.rounds, 1),
+                'max_proposals': self.max_proposals,
+                'rounds_per_second': self.throughput}
+
+    def summary(self):
+        '''
+            One line summary shown next to the progress bars
+        '''
+        total = sum(self.seconds.values())
+        shares = ' '.join('%s %.0f%%' % (phase, 100 * seconds / total)
+                          for phase, seconds in self.seconds.items() if total > 0)
+        return '%s | %.1f prop/round | %.0f rounds/s' % \
+            (shares, self.proposals / max(self.rounds, 1), self.throughput)
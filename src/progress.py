@@ -0,0 +1,32 @@
+# progress bars are drawn with tqdm when it is installed, False runs silently
+enabled = True
+
+
+class Silent_Progress(object):
+    '''
+        Stand-in for a tqdm bar, iterating without drawing anything
+    '''
+
+    def __init__(self, iterable, **kwargs):
+        self.iterable = iterable
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def set_postfix_str(self, s):
+        pass
+
+
+def progress_bar(iterable, **kwargs):
+    '''
+        tqdm(iterable, **kwargs) when progress bars are enabled and tqdm is installed, the
+        iterable otherwise
+    '''
+    if enabled:
+        try:
+            from tqdm import tqdm
+        except ImportError:
+            pass
+        else:
+            return tqdm(iterable, **kwargs)
+    return Silent_Progress(iterable)
@@ -0,0 +1,170 @@
+import numpy as np
+
+from src.storage import Regret_Store
+
+
+class Regret_Accumulator(object):
+    '''
+        Streaming regret of the players against a reference matching, the curves of the trials
+        folded into their mean and variance, in memory or in a Regret_Store
+    '''
+
+    # values of the blocks in which rounds credited at once are accumulated
+    block_size = 2**20
+
+    def __init__(self, arms_mean, optimal_matching, horizon, checkpoints=None, store_dir=None, resume=False):
+        # arms_mean[a_idx][p_idx] is the mean reward of arm a_idx for player p_idx
+        self.arms_mean = np.asarray(arms_mean, float)
+        self.num_arms, self.num_players = self.arms_mean.shape
+
+        # mean of each player under the reference matching, 0 if left unmatched
+        self.optimal_mean = np.zeros(self.num_players)
+        for a_idx, p_idx in enumerate(optimal_matching):
+            if p_idx >= 0:
+                self.optimal_mean[p_idx] = self.arms_mean[a_idx, p_idx]
+
+        self.setup(horizon, checkpoints, store_dir, resume)
+
+    def setup(self, horizon, checkpoints, store_dir=None, resume=False):
+        self.horizon = horizon
+        # rounds counted from 1 at which the cumulative regret is stored
+        if checkpoints is None:
+            self.checkpoints = np.arange(1, horizon + 1)
+        else:
+            self.checkpoints = np.unique(np.asarray(checkpoints, int))
+        self.num_points = len(self.checkpoints)
+
+        self.trials = 0
+        if store_dir is None:
+            self.store = None
+            self.mean = np.zeros((self.num_players, self.num_points))
+            self.m2 = np.zeros((self.num_players, self.num_points))
+        else:
+            if resume:
+                self.store = Regret_Store.open(store_dir)
+                if not np.array_equal(self.store.checkpoints, self.checkpoints):
+                    raise ValueError(store_dir + " holds the regrets of other rounds")
+                self.trials = self.store.trials
+            else:
+                self.store = Regret_Store(store_dir, self.num_players, self.checkpoints)
+            self.mean, self.m2 = self.store.mean, self.store.m2
+        self.start_trial()
+
+    @classmethod
+    def from_arms(cls, arms, optimal_matching, horizon, checkpoints=None, store_dir=None, resume=False):
+        return cls([arm.mean for arm in arms], optimal_matching, horizon, checkpoints, store_dir, resume)
+
+    @classmethod
+    def from_optimal_mean(cls, optimal_mean, horizon, checkpoints=None, store_dir=None):
+        '''
+            Accumulator without a table of means, fed with record_regret only, for
+            markets too large to hold the mean of every pair
+        '''
+        regret_accumulator = cls.__new__(cls)
+        regret_accumulator.arms_mean = None
+        regret_accumulator.optimal_mean = np.asarray(optimal_mean, float)
+        regret_accumulator.num_players = len(regret_accumulator.optimal_mean)
+        regret_accumulator.setup(horizon, checkpoints, store_dir)
+        return regret_accumulator
+
+    def trial_copy(self):
+        '''
+            Accumulator of single trials against the same reference, without the
+            regrets of the trials nor their store
+        '''
+        copy = Regret_Accumulator.__new__(Regret_Accumulator)
+        copy.arms_mean, copy.optimal_mean, copy.num_players = self.arms_mean, self.optimal_mean, self.num_players
+        copy.horizon, copy.checkpoints, copy.num_points = self.horizon, self.checkpoints, self.num_points
+        copy.trials, copy.store, copy.mean, copy.m2 = 0, None, None, None
+        copy.curve = copy.cumulative = None
+        return copy
+
+    def trial_accumulator(self, workers=None):
+        '''
+            Accumulator recording the trials run by workers, self when they run in process
+        '''
+        return self if workers is None or workers <= 1 else self.trial_copy()
+
+    @property
+    def regrets(self):
+        '''
+            Mean regrets of the trials, the store itself when they live on disk
+        '''
+        return self.mean if self.store is None else self.store
+
+    @property
+    def variance(self):
+        if self.trials < 2:
+            return np.zeros_like(self.mean)
+        return self.m2 / (self.trials - 1)
+
+    def start_trial(self):
+        self.t = 0
+        self.next_point = 0
+        self.cumulative = np.zeros(self.num_players)
+        if self.store is None:
+            self.curve = np.zeros((self.num_players, self.num_points))
+        else:
+            self.curve = self.store.new_curve()
+
+    def record(self, matching, rounds=1):
+        '''
+            Regret of a round given the matching indexed by arms and valued by players
+        '''
+        matching = np.asarray(matching)
+        arms_idx = np.nonzero(matching >= 0)[0]
+        self.record_pairs(matching[arms_idx], arms_idx, rounds)
+
+    def record_pairs(self, players_idx, arms_idx, rounds=1):
+        '''
+            Regret of rounds rounds where player players_idx[i] pulled arm arms_idx[i]
+        '''
+        regret = self.optimal_mean.copy()
+        regret[players_idx] -= self.arms_mean[arms_idx, players_idx]
+        self.record_regret(regret, rounds)
+
+    def record_regret(self, regret, rounds=1):
+        '''
+            Regret of each player in a round, repeated for rounds rounds
+        '''
+        if rounds == 1:
+            self.cumulative += regret
+            self.t += 1
+            if self.next_point < self.num_points and self.checkpoints[self.next_point] == self.t:
+                self.curve[:, self.next_point] = self.cumulative
+                self.next_point += 1
+            return
+
+        # the same additions as round by round, in blocks of rounds, so the regrets are identical
+        block_rounds = max(1, min(rounds, self.block_size // max(self.num_players, 1)))
+        block = np.empty((block_rounds, self.num_players))
+        while rounds > 0:
+            size = min(rounds, block_rounds)
+            block[:size] = regret
+            block[0] += self.cumulative
+            np.add.accumulate(block[:size], axis=0, out=block[:size])
+
+            stop = np.searchsorted(self.checkpoints, self.t + size, 'right')
+            points = self.checkpoints[self.next_point:stop] - self.t - 1
+            self.curve[:, self.next_point:stop] = block[points].T
+            self.cumulative = block[size - 1].copy()
+            self.t += size
+            self.next_point = stop
+            rounds -= size
+
+    def finish_trial(self):
+        '''
+            Returns the curve of the trial and gets ready for the next one
+        '''
+        curve = self.curve
+        self.start_trial()
+        return curve
+
+    def add_trial(self, curve):
+        self.trials += 1
+        if self.store is not None:
+            self.store.add_trial(curve, self.trials)
+            return
+        delta = curve - self.mean
+        self.mean += delta / self.trials
+        self.m2 += delta * (curve - self.mean)
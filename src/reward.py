@@ -0,0 +1,157 @@
+import numpy as np
+from collections import OrderedDict
+from math import erfc, sqrt
+
+
+def bernoulli_reward(mean, noise):
+    '''
+        1 with probability mean, the standard normal noise being turned into a
+        uniform one by its distribution function
+    '''
+    return 1.0 if 0.5 * erfc(-noise / sqrt(2)) < mean else 0.0
+
+
+class Block_Reward_Source(object):
+    '''
+        Rewards of one arm read from blocks of noise of shape (chunk_rounds, num_players), each
+        drawn from the stream (seed, arm, block) and at most max_blocks kept
+    '''
+
+    def __init__(self, mean, var, seed, arm_idx=0, chunk_rounds=4096, max_blocks=None, bernoulli=False):
+        self.mean = np.asarray(mean, float).tolist()
+        self.var = var
+        self.num_players = len(self.mean)
+        self.seed = seed
+        self.arm_idx = arm_idx
+        self.chunk_rounds = chunk_rounds
+        self.max_blocks = max_blocks
+        self.bernoulli = bernoulli
+        self.reset()
+
+    def reset(self):
+        # block, row within the block and noise column currently read by each player
+        self.block_idx = [-1] * self.num_players
+        self.row = [self.chunk_rounds] * self.num_players
+        self.column = [None] * self.num_players
+        self.blocks = OrderedDict()
+
+    def block(self, b_idx):
+        '''
+            Block b_idx indexed by (player, row), drawn on the first request
+        '''
+        block = self.blocks.get(b_idx)
+        if block is None:
+            seed = np.random.SeedSequence(self.seed, spawn_key=(self.arm_idx, b_idx))
+            block = np.ascontiguousarray(np.random.Generator(np.random.PCG64(seed))
+                                         .standard_normal((self.chunk_rounds, self.num_players)).T)
+            self.blocks[b_idx] = block
+            if self.max_blocks is not None and len(self.blocks) > self.max_blocks:
+                self.blocks.popitem(last=False)
+        elif self.max_blocks is not None:
+            self.blocks.move_to_end(b_idx)
+        return block
+
+    def __getstate__(self):
+        # the blocks are drawn again from the seed instead of being stored
+        state = self.__dict__.copy()
+        state['blocks'] = OrderedDict()
+        state['column'] = [None] * self.num_players
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for p_idx, b_idx in enumerate(self.block_idx):
+            if b_idx >= 0:
+                self.column[p_idx] = self.block(b_idx)[p_idx]
+
+    def sample(self, p_idx, t=None):
+        row = self.row[p_idx]
+        if row == self.chunk_rounds:
+            # refill lazily once the player has read the whole column
+            self.block_idx[p_idx] += 1
+            self.column[p_idx] = self.block(self.block_idx[p_idx])[p_idx]
+            row = 0
+        self.row[p_idx] = row + 1
+        noise = self.column[p_idx].item(row)
+        if self.bernoulli:
+            return bernoulli_reward(self.mean[p_idx], noise)
+        return self.mean[p_idx] + self.var * noise
+
+
+class Philox_Reward_Oracle(object):
+    '''
+        Counter based noise for common random numbers, the same for the same (trial, t, arm)
+        in any order, players pulling the same arm in the same round sharing it
+    '''
+
+    def __init__(self, seed, num_arms, num_players):
+        self.seed = seed
+        self.num_arms = num_arms
+        self.num_players = num_players
+        self.cached = None
+        self.cached_noise = None
+
+    def round_noise(self, trial, t):
+        if self.cached != (trial, t):
+            bit_generator = np.random.Philox(counter=[0, t, 0, 0],
+                                             key=np.array([self.seed, trial], np.uint64))
+            self.cached_noise = np.random.Generator(bit_generator).standard_normal(self.num_arms)
+            self.cached = (trial, t)
+        return self.cached_noise
+
+    def noise(self, trial, t, a_idx, p_idx):
+        return self.round_noise(trial, t).item(a_idx)
+
+
+class Oracle_Source(object):
+    '''
+        Rewards of one arm in one trial read from a Philox_Reward_Oracle
+    '''
+
+    def __init__(self, oracle, a_idx, mean, var, trial=0, bernoulli=False):
+        self.oracle = oracle
+        self.a_idx = a_idx
+        self.mean = np.asarray(mean, float).tolist()
+        self.var = var
+        self.trial = trial
+        self.bernoulli = bernoulli
+
+    def sample(self, p_idx, t):
+        noise = self.oracle.noise(self.trial, t, self.a_idx, p_idx)
+        if self.bernoulli:
+            return bernoulli_reward(self.mean[p_idx], noise)
+        return self.mean[p_idx] + self.var * noise
+
+
+def gaussian_arms_mean(arms):
+    '''
+        Means of the arms for the array engines, which only draw Gaussian rewards
+    '''
+    if any(arm.bernoulli for arm in arms):
+        raise ValueError("The array engines only simulate Gaussian rewards")
+    return [arm.mean for arm in arms]
+
+
+def draw_entropy(rng=None):
+    '''
+        Root seed of the block sources taken from a generator or the global random state
+    '''
+    if rng is None:
+        return int(np.random.randint(0, 2**63 - 1))
+    return int(rng.integers(0, 2**63 - 1))
+
+
+def set_reward_streams(arms, rng=None, chunk_rounds=None, max_blocks=None, oracle=None, trial_idx=0):
+    '''
+        Points the arms at the generator of a trial, through an oracle or block sources if given
+    '''
+    seed = None if chunk_rounds is None or oracle is not None else draw_entropy(rng)
+    for a_idx, arm in enumerate(arms):
+        arm.rng = rng
+        if oracle is not None:
+            arm.source = Oracle_Source(oracle, a_idx, arm.mean, arm.var, trial_idx, arm.bernoulli)
+        elif chunk_rounds is not None:
+            arm.source = Block_Reward_Source(arm.mean, arm.var, seed, a_idx, chunk_rounds, max_blocks,
+                                             arm.bernoulli)
+        else:
+            arm.source = None
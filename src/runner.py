@@ -0,0 +1,55 @@
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def run_trial(trial, seed, trial_idx):
+    '''
+        Runs one trial with its own generator, the seed being spawned from the root seed
+    '''
+    return trial(np.random.Generator(np.random.PCG64(seed)), trial_idx=trial_idx)
+
+
+class Trial_Runner(object):
+    '''
+        Runner of independent trials over a pool of processes, trial i getting the i-th generator
+        spawned from the root seed and the results handed back in trial order
+    '''
+
+    def __init__(self, workers=1, seed=None):
+        self.workers = workers
+        self.seed = seed
+
+    def seeds(self, trials):
+        return np.random.SeedSequence(self.seed).spawn(trials)
+
+    def imap(self, trial, trials):
+        '''
+            Yields trial(rng, trial_idx=i) in trial order, with at most twice as many trials as workers
+            in flight
+        '''
+        seeds = self.seeds(trials)
+
+        if self.workers is None or self.workers <= 1:
+            for trial_idx, seed in enumerate(seeds):
+                yield run_trial(trial, seed, trial_idx)
+            return
+
+        with ProcessPoolExecutor(self.workers) as pool:
+            in_flight = deque()
+            for trial_idx, seed in enumerate(seeds):
+                in_flight.append(pool.submit(run_trial, trial, seed, trial_idx))
+                if len(in_flight) >= 2 * self.workers:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+
+def run_trials(trial, trials, workers=None, seed=None):
+    '''
+        Without workers nor seed the trials run in process on the global random state,
+        exactly like the original loops of the experiments
+    '''
+    if workers is None and seed is None:
+        return (trial(None, trial_idx=trial_idx) for trial_idx in range(trials))
+    return Trial_Runner(workers, seed).imap(trial, trials)
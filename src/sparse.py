@@ -0,0 +1,272 @@
+import numpy as np
+from functools import partial
+
+from src.regret import Regret_Accumulator
+from src.reward import gaussian_arms_mean
+from src.runner import run_trials
+
+
+def sparse_Gale_Shapley(proposals, ranks, num_arms):
+    '''
+        GS over truncated lists padded with -1, ranks being -1 for arms not listing the player,
+        returning the matching and the position of each player's arm (-1 if unmatched)
+    '''
+    num_players, k = proposals.shape
+    lengths = (proposals >= 0).sum(axis=1)
+    unacceptable = np.iinfo(ranks.dtype).max
+
+    propose_order = np.zeros(num_players, int)
+    holder = np.full(num_arms, -1)
+    holder_rank = np.full(num_arms, unacceptable)
+
+    # a pass only touches the arms proposed to, so it costs O(free players)
+    free = np.nonzero(lengths > 0)[0]
+    while free.size != 0:
+        arms_idx = proposals[free, propose_order[free]]
+        arms_ranks = ranks[free, propose_order[free]]
+        acceptable = arms_ranks >= 0
+        arms_ranks = np.where(acceptable, arms_ranks, unacceptable)
+
+        # each arm keeps the best among its holder and the new acceptable proposals
+        np.minimum.at(holder_rank, arms_idx, arms_ranks)
+        accepted = acceptable & (arms_ranks == holder_rank[arms_idx])
+
+        # holders beaten by a new proposal become free again
+        accepted_arms = arms_idx[accepted]
+        beaten_p = holder[accepted_arms]
+        beaten_p = beaten_p[beaten_p >= 0]
+        holder[accepted_arms] = free[accepted]
+
+        free = np.concatenate([free[~accepted], beaten_p])
+        propose_order[free] += 1
+        free = free[propose_order[free] < lengths[free]]
+
+    position = np.full(num_players, -1)
+    matched = holder[holder >= 0]
+    position[matched] = propose_order[matched]
+    return holder, position
+
+
+class Sparse_Market(object):
+    '''
+        Two side market where every player lists k arms, everything about a pair kept in its slot
+        of the (players, k) lists
+    '''
+
+    def __init__(self, players_lists, arms_lists, means, var):
+        # players_lists[p_idx] are the arms listed by player p_idx from the most preferable
+        self.players_lists = np.asarray(players_lists, int)
+        # arms_lists[a_idx] are the players listed by arm a_idx from the most preferable
+        self.arms_lists = np.asarray(arms_lists, int)
+        # means[p_idx][j] is the mean reward of arm players_lists[p_idx][j] for player p_idx
+        self.means = np.asarray(means, float)
+        self.var = var
+
+        self.num_players, self.k = self.players_lists.shape
+        self.num_arms = len(self.arms_lists)
+        self.listed = self.players_lists >= 0
+        self.arms_ranks = self.build_arms_ranks()
+        self.epsilon = 10**(-10)
+
+    @classmethod
+    def from_dense(cls, arms_mean, var, players_rankings, arms_rankings, k=None):
+        '''
+            Keeps the first k arms of each player's ranking, every arm listing all the
+            players, with arms_mean[a_idx][p_idx] and rankings as in GS_Market
+        '''
+        players_rankings = np.asarray(players_rankings, int)[:, :k]
+        players_idx = np.arange(len(players_rankings))[:, None]
+        means = np.asarray(arms_mean, float)[players_rankings, players_idx]
+        return cls(players_rankings, arms_rankings, means, var)
+
+    @classmethod
+    def from_objects(cls, players, arms, k=None):
+        return cls.from_dense(gaussian_arms_mean(arms), arms[0].var,
+                              [player.get_true_ranking() for player in players],
+                              [arm.get_ranking() for arm in arms], k)
+
+    @classmethod
+    def random(cls, num_players, num_arms, k, var=1, rng=None):
+        '''
+            Each player lists k random arms by decreasing random mean, each arm listing those players
+            in a random order
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+
+        players_lists = cls.draw_lists(num_players, num_arms, k, rng)
+        means = -np.sort(-rng.uniform(0, 1, (num_players, k)), axis=1)
+
+        # group the players by the arms they listed, in a random order within each arm
+        arms_idx = players_lists.ravel()
+        players_idx = np.repeat(np.arange(num_players), k)
+        shuffled = rng.permutation(len(arms_idx))
+        order = shuffled[np.argsort(arms_idx[shuffled], kind='stable')]
+        lengths = np.bincount(arms_idx, minlength=num_arms)
+        starts = np.cumsum(lengths) - lengths
+        columns = np.arange(len(order)) - np.repeat(starts, lengths)
+
+        arms_lists = np.full((num_arms, max(lengths.max(), 1)), -1)
+        arms_lists[arms_idx[order], columns] = players_idx[order]
+        return cls(players_lists, arms_lists, means, var)
+
+    @staticmethod
+    def draw_lists(num_players, num_arms, k, rng):
+        '''
+            k distinct arms per player. Small markets shuffle every row, large ones
+            avoid the players x arms array by redrawing the rows with repeated arms.
+        '''
+        if num_arms <= 4 * k:
+            return np.argsort(rng.random((num_players, num_arms)), axis=1)[:, :k]
+
+        lists = rng.integers(num_arms, size=(num_players, k))
+        while True:
+            ordered = np.sort(lists, axis=1)
+            repeated = np.nonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))[0]
+            if repeated.size == 0:
+                return lists
+            lists[repeated] = rng.integers(num_arms, size=(len(repeated), k))
+
+    def build_arms_ranks(self):
+        '''
+            arms_ranks[p_idx][j] is the position of player p_idx in the list of arm
+            players_lists[p_idx][j], -1 if that arm does not list p_idx
+        '''
+        players_idx, slots = np.nonzero(self.listed)
+        players_keys = self.players_lists[players_idx, slots] * self.num_players + players_idx
+
+        arms_idx, positions = np.nonzero(self.arms_lists >= 0)
+        arms_keys = arms_idx * self.num_players + self.arms_lists[arms_idx, positions]
+        order = np.argsort(arms_keys)
+        arms_keys, positions = arms_keys[order], positions[order]
+
+        found = np.searchsorted(arms_keys, players_keys)
+        found = np.minimum(found, len(arms_keys) - 1)
+        listed = arms_keys[found] == players_keys if len(arms_keys) else np.zeros(len(players_keys), bool)
+
+        arms_ranks = np.full(self.players_lists.shape, -1)
+        arms_ranks[players_idx[listed], slots[listed]] = positions[found[listed]]
+        return arms_ranks
+
+    def stable_matching(self, order=None):
+        '''
+            Player-optimal stable matching when each player proposes to its slots in order, and the
+            slot of each player (-1 if unmatched)
+        '''
+        if order is None:
+            proposals, ranks = self.players_lists, self.arms_ranks
+        else:
+            proposals = np.take_along_axis(self.players_lists, order, axis=1)
+            ranks = np.take_along_axis(self.arms_ranks, order, axis=1)
+
+        matching, position = sparse_Gale_Shapley(proposals, ranks, self.num_arms)
+        slots = position.copy()
+        if order is not None:
+            matched = np.nonzero(position >= 0)[0]
+            slots[matched] = order[matched, position[matched]]
+        return matching, slots
+
+    def get_optimal_mean(self):
+        '''
+            Mean reward of each player under the player-optimal stable matching of the
+            true preferences, 0 if left unmatched
+        '''
+        _, slots = self.stable_matching()
+        matched = np.nonzero(slots >= 0)[0]
+        optimal_mean = np.zeros(self.num_players)
+        optimal_mean[matched] = self.means[matched, slots[matched]]
+        return optimal_mean
+
+    def get_regret_accumulator(self, horizon, checkpoints=None):
+        return Regret_Accumulator.from_optimal_mean(self.get_optimal_mean(), horizon, checkpoints)
+
+    def run_UCB(self, horizon, trials, regret_accumulator, workers=None, seed=None):
+        '''
+            Folds the cumulative regrets of every trial into regret_accumulator, in
+            trial order, and returns their mean
+        '''
+        trial = partial(self.run_UCB_trial, horizon, regret_accumulator.trial_accumulator(workers))
+        for curve in run_trials(trial, trials, workers, seed):
+            regret_accumulator.add_trial(curve)
+        return regret_accumulator.mean
+
+    def run_UCB_trial(self, horizon, regret_accumulator, rng=None, trial_idx=0):
+        '''
+            Centralized UCB restricted to the listed pairs, the same as GS_Market.match for a dense
+            market
+        '''
+        rng = np.random if rng is None else rng
+        regret_accumulator.start_trial()
+
+        count = np.zeros((self.num_players, self.k))
+        est_mean = np.zeros((self.num_players, self.k))
+
+        # the slots of each player by decreasing ucb, ties broken by arm, along with
+        # what GS proposes from them and their sort keys -ucb, kept sorted by reposition
+        ranked = np.where(self.listed, -np.inf, np.inf)
+        order = np.lexsort((np.where(self.listed, self.players_lists, self.num_arms), ranked), axis=1)
+        proposals = np.take_along_axis(self.players_lists, order, axis=1)
+        ranks = np.take_along_axis(self.arms_ranks, order, axis=1)
+        ranked = np.take_along_axis(ranked, order, axis=1)
+
+        for t in range(1, horizon + 1):
+            matching, position = sparse_Gale_Shapley(proposals, ranks, self.num_arms)
+
+            matched_a = np.nonzero(matching >= 0)[0]
+            matched_p = matching[matched_a]
+            matched_s = order[matched_p, position[matched_p]]
+            means = self.means[matched_p, matched_s]
+            rewards = means + self.var * rng.standard_normal(len(matched_a))
+
+            # same arithmetic as Player.update
+            counts = count[matched_p, matched_s] + 1
+            means_hat = est_mean[matched_p, matched_s]
+            means_hat += (rewards - means_hat) / counts
+            count[matched_p, matched_s] = counts
+            est_mean[matched_p, matched_s] = means_hat
+            ucb = means_hat + np.sqrt(3 * np.log(t) / (2*(counts + self.epsilon)))
+            reposition(ranked, proposals, matched_p, position[matched_p], -ucb, (order, ranks))
+
+            regret = regret_accumulator.optimal_mean.copy()
+            regret[matched_p] -= means
+            regret_accumulator.record_regret(regret)
+
+        return regret_accumulator.finish_trial()
+
+
+def reposition(ranked, proposals, rows, src, keys, carried=()):
+    '''
+        Player.reposition for the distinct rows rows at once, moving column src[i] of row rows[i]
+        to the place of its new key keys[i] in ranked, proposals and carried
+    '''
+    k = ranked.shape[1]
+    arms = proposals[rows, src]
+
+    # dst is the number of the other slots of the row before the slot, searched
+    # among the k - 1 of them, column i of the row without src being i + (i >= src)
+    low = np.zeros(len(rows), int)
+    high = np.full(len(rows), k - 1)
+    while True:
+        searching = np.nonzero(low < high)[0]
+        if searching.size == 0:
+            break
+        middle = (low[searching] + high[searching]) // 2
+        columns = middle + (middle >= src[searching])
+        row_keys = ranked[rows[searching], columns]
+        before = (row_keys < keys[searching]) | \
+            ((row_keys == keys[searching]) & (proposals[rows[searching], columns] < arms[searching]))
+        low[searching[before]] = middle[before] + 1
+        high[searching[~before]] = middle[~before]
+    dst = low
+
+    # columns between src and dst shift by one towards src
+    moving_right = dst < src
+    lengths = np.abs(dst - src)
+    first = np.where(moving_right, dst, src + 1)
+    segment = np.repeat(np.arange(len(rows)), lengths)
+    shifted_rows = rows[segment]
+    from_columns = first[segment] + np.arange(len(segment)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    to_columns = from_columns + np.where(moving_right, 1, -1)[segment]
+
+    for array, values in [(ranked, keys), (proposals, arms)] + [(array, array[rows, src]) for array in carried]:
+        array[shifted_rows, to_columns] = array[shifted_rows, from_columns]
+        array[rows, dst] = values
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class Market_State(object):
+    '''
+        Statistics of all the players and arms of a market in a few contiguous arrays, the Player
+        and Arm objects being views onto their rows
+    '''
+
+    __slots__ = ('num_players', 'num_arms', 'dtype',
+                 'count', 'est_mean', 'ucb', 'order', 'ranked',
+                 'arms_mean', 'arms_rankings')
+
+    def __init__(self, num_players, num_arms, dtype=float, players=True, arms=True):
+        self.num_players = num_players
+        self.num_arms = num_arms
+        self.dtype = np.dtype(dtype)
+        # float32 halves the memory, counts being exact up to 2**24 pulls of a pair
+        index_dtype = np.int32 if self.dtype.itemsize < 8 else np.intp
+
+        # statistics of the players, indexed by (player, arm), None without players
+        self.count = self.est_mean = self.ucb = self.order = self.ranked = None
+        if players:
+            self.count = np.zeros((num_players, num_arms), self.dtype)
+            self.est_mean = np.zeros((num_players, num_arms), self.dtype)
+            self.ucb = np.full((num_players, num_arms), np.inf, self.dtype)
+            # arms of each player by decreasing ucb, ties broken by index
+            self.order = np.tile(np.arange(num_arms, dtype=index_dtype), (num_players, 1))
+            # sort keys -ucb of the arms in order, searched by bisection
+            self.ranked = np.full((num_players, num_arms), -np.inf, self.dtype)
+
+        # true means and rankings of the arms, indexed by (arm, player), None without arms
+        self.arms_mean = self.arms_rankings = None
+        if arms:
+            self.arms_mean = np.zeros((num_arms, num_players), self.dtype)
+            self.arms_rankings = np.tile(np.arange(num_players, dtype=index_dtype), (num_arms, 1))
+
+    @property
+    def nbytes(self):
+        arrays = [getattr(self, name) for name in
+                  ('count', 'est_mean', 'ucb', 'order', 'ranked', 'arms_mean', 'arms_rankings')]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def reset_players(self):
+        self.count[:] = 0
+        self.est_mean[:] = 0
+        self.ucb[:] = np.inf
+        self.order[:] = np.arange(self.num_arms)
+        self.ranked[:] = -np.inf
+
+    def make_players(self, true_rankings, oracles=None):
+        '''
+            One Player per row of the state, the oracles playing their true ranking
+        '''
+        # imported here since the players themselves build a state when given none
+        from src.player import Player
+
+        oracles = [False] * self.num_players if oracles is None else oracles
+        return [Player(self.num_arms, true_rankings[p_idx], oracles[p_idx], self, p_idx)
+                for p_idx in range(self.num_players)]
+
+    def make_arms(self, arms_mean, var, arms_rankings, rng=None, bernoulli=False):
+        '''
+            One Arm per row of the state, arms_mean[a_idx][p_idx] being the mean
+            reward of arm a_idx for player p_idx
+        '''
+        # imported here since the arms themselves build a state when given none
+        from src.arm import Arm
+
+        return [Arm(self.num_players, arms_mean[a_idx], var, arms_rankings[a_idx], rng, bernoulli, self, a_idx)
+                for a_idx in range(self.num_arms)]
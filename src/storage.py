@@ -0,0 +1,172 @@
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+class Regret_Store(object):
+    '''
+        On-disk mean and variance of the regret curves as .npy files mapped in memory, with
+        downsampled levels of the mean for plots
+    '''
+
+    def __init__(self, directory, num_players, checkpoints, factor=10, chunk_size=2**22):
+        self.directory = directory
+        self.num_players = num_players
+        self.checkpoints = np.asarray(checkpoints, int)
+        self.num_points = len(self.checkpoints)
+        self.factor = factor
+        # points folded at once, such that a chunk holds about chunk_size values
+        self.chunk_points = max(1, chunk_size // num_players)
+        self.trials = 0
+        self.curve_file = 1
+
+        os.makedirs(directory, exist_ok=True)
+        np.save(self.path('checkpoints'), self.checkpoints)
+        self.open_arrays('w+')
+        self.save_meta()
+
+    @classmethod
+    def open(cls, directory):
+        '''
+            Store written before, with its arrays mapped for reading and writing
+        '''
+        store = cls.__new__(cls)
+        store.directory = directory
+        with open(store.path('meta', '.json')) as f:
+            meta = json.load(f)
+        store.num_players = meta['num_players']
+        store.factor = meta['factor']
+        store.chunk_points = meta['chunk_points']
+        store.trials = meta['trials']
+        store.checkpoints = np.load(store.path('checkpoints'))
+        store.num_points = len(store.checkpoints)
+        store.curve_file = 1
+        store.open_arrays('r+')
+        return store
+
+    def __getstate__(self):
+        # pickling would copy the mapped arrays, the trials of workers are added by the parent
+        raise TypeError("The store in " + self.directory + " is not sent to workers")
+
+    def path(self, name, extension='.npy'):
+        return os.path.join(self.directory, name + extension)
+
+    def open_arrays(self, mode):
+        shape = (self.num_points, self.num_players)
+        self.mean_by_point = open_memmap(self.path('mean'), mode, float, shape)
+        self.m2_by_point = open_memmap(self.path('m2'), mode, float, shape)
+
+        # levels[k - 1] holds the points factor**k * i of the mean
+        self.strides = []
+        self.levels = []
+        stride = self.factor
+        while stride < self.num_points:
+            self.strides.append(stride)
+            self.levels.append(open_memmap(self.path('mean_%d' % stride), mode, float,
+                                           (-(-self.num_points // stride), self.num_players)))
+            stride *= self.factor
+
+    def save_meta(self):
+        meta = {'num_players': self.num_players,
+                'factor': self.factor,
+                'chunk_points': self.chunk_points,
+                'trials': self.trials}
+        with open(self.path('meta', '.json'), 'w') as f:
+            json.dump(meta, f)
+
+    @property
+    def mean(self):
+        return self.mean_by_point.T
+
+    @property
+    def m2(self):
+        return self.m2_by_point.T
+
+    @property
+    def shape(self):
+        return self.mean.shape
+
+    def __len__(self):
+        return self.num_players
+
+    def __getitem__(self, index):
+        return self.mean[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.mean, dtype)
+
+    def new_curve(self):
+        '''
+            Zeroed curve of a trial mapped from a file removed as soon as it is open
+        '''
+        self.curve_file = 1 - self.curve_file
+        shape = (self.num_points, self.num_players)
+        path = self.path('curve_%d_%d' % (os.getpid(), self.curve_file))
+        curve = open_memmap(path, 'w+', float, shape)
+        try:
+            os.remove(path)
+        except OSError:
+            # systems that cannot remove a mapped file keep it until it is overwritten
+            pass
+        return curve.T
+
+    def add_trial(self, curve, trials):
+        '''
+            Welford's update with the curve of the trials-th trial, indexed by
+            (player, point), followed by the downsamples of the points updated
+        '''
+        curve_by_point = curve.T
+        for start in range(0, self.num_points, self.chunk_points):
+            stop = min(start + self.chunk_points, self.num_points)
+            block = np.asarray(curve_by_point[start:stop])
+            mean = self.mean_by_point[start:stop]
+            delta = block - mean
+            mean += delta / trials
+            self.m2_by_point[start:stop] += delta * (block - mean)
+
+            for stride, level in zip(self.strides, self.levels):
+                first = -(-start // stride)
+                last = -(-stop // stride)
+                level[first:last] = mean[first * stride - start::stride]
+
+        self.trials = trials
+        self.flush()
+
+    def flush(self):
+        self.mean_by_point.flush()
+        self.m2_by_point.flush()
+        for level in self.levels:
+            level.flush()
+        self.save_meta()
+
+    def points(self, p_idx, step, stop=-1):
+        '''
+            Same as mean[p_idx][0:stop:step], read from the coarsest downsample that
+            holds all these points
+        '''
+        points = range(*slice(0, stop, step).indices(self.num_points))
+        array, stride = self.mean_by_point, 1
+        for level_stride, level in zip(self.strides, self.levels):
+            if step % level_stride == 0:
+                array, stride = level, level_stride
+        rows = np.arange(len(points)) * (step // stride)
+        return np.asarray(array[rows, p_idx])
+
+
+def plot_points(regrets, p_idx, step, stop=-1):
+    '''
+        regrets[p_idx][0:stop:step], where only those points are read from disk when
+        regrets is a Regret_Store
+    '''
+    if isinstance(regrets, Regret_Store):
+        return regrets.points(p_idx, step, stop)
+    return np.asarray(regrets[p_idx])[0:stop:step]
+
+
+def store_path(storage_dir, name):
+    '''
+        Directory of the store name under storage_dir, None when the regrets are kept in memory
+    '''
+    return None if storage_dir is None else os.path.join(storage_dir, name)
@@ -0,0 +1,88 @@
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+
+def expand_grid(grid, **base):
+    '''
+        One configuration per combination of the values in grid, each one completed
+        with the fixed parameters in base
+    '''
+    names = sorted(grid)
+    return [dict(base, **dict(zip(names, values)))
+            for values in itertools.product(*(grid[name] for name in names))]
+
+
+def to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError("Cannot hash " + repr(value))
+
+
+class Sweep(object):
+    '''
+        Scheduler of jobs job(config, seed) keyed by the name of the sweep, the configuration and
+        the seed, each result cached on disk as soon as it is done
+    '''
+
+    def __init__(self, job, configs, cache_dir, seed=0, workers=None, name=None):
+        self.job = job
+        # the module is left out, which differs when the job is run as __main__
+        self.name = job.__qualname__ if name is None else name
+        self.configs = list(configs)
+        self.cache_dir = cache_dir
+        self.seed = seed
+        self.workers = workers
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, config):
+        description = {'job': self.name,
+                       'config': config,
+                       'seed': self.seed}
+        text = json.dumps(description, sort_keys=True, default=to_json)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def load(self, key):
+        with np.load(self.path(key)) as result:
+            return {name: result[name] for name in result.files}
+
+    def save(self, key, result):
+        # write to a temporary file first such that a killed job leaves no partial result
+        path = self.path(key)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **result)
+        os.replace(path + '.tmp', path)
+
+    def pending(self):
+        return [config for config in self.configs
+                if not os.path.exists(self.path(self.key(config)))]
+
+    def run(self):
+        '''
+            Returns the results in the order of the configurations
+        '''
+        jobs = {}
+        for config in self.pending():
+            key = self.key(config)
+            jobs[key] = (config, int(key[:16], 16))
+
+        if self.workers is None or self.workers <= 1:
+            for key, (config, seed) in jobs.items():
+                self.save(key, self.job(config, seed))
+        else:
+            with ProcessPoolExecutor(self.workers) as pool:
+                futures = {pool.submit(self.job, config, seed): key
+                           for key, (config, seed) in jobs.items()}
+                for future in as_completed(futures):
+                    self.save(futures[future], future.result())
+
+        return [self.load(self.key(config)) for config in self.configs]
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class Matching_Trace(object):
+    '''
+        Run-length encoded recorder of the matchings of GS_Market.match, one row per change point
+    '''
+
+    magic = b'MTRACE1\0'
+
+    def __init__(self, num_players, num_arms):
+        self.num_players = num_players
+        self.num_arms = num_arms
+        # rows hold player + 1, 0 marking an unmatched arm
+        self.dtype = np.min_scalar_type(num_players)
+
+        # round at which each run starts, and its matching
+        self.starts = []
+        self.rows = []
+        # index of the first run of each trial
+        self.trials = []
+        self.last_t = None
+        self.last = None
+        self.frozen = None
+
+    def record(self, t, matching):
+        # a round going back to an earlier one starts a new trial
+        if self.last_t is None or t <= self.last_t:
+            self.trials.append(len(self.starts))
+            self.last = None
+        self.last_t = t
+
+        if self.last is not None and np.array_equal(matching, self.last):
+            return
+        self.last = matching.copy()
+        self.starts.append(t)
+        self.rows.append((matching + 1).astype(self.dtype))
+        self.frozen = None
+
+    def extend(self, other):
+        '''
+            Appends the trials of other, the trace of trials run by a worker
+        '''
+        offset = len(self.starts)
+        self.trials.extend(offset + first for first in other.trials)
+        self.starts.extend(other.starts)
+        self.rows.extend(other.rows)
+        self.last_t, self.last = other.last_t, other.last
+        self.frozen = None
+
+    def arrays(self):
+        '''
+            The runs as arrays: the first run of each trial, the start of each run
+            and the encoded matchings, one row per run
+        '''
+        if self.frozen is None:
+            self.frozen = (np.array(self.trials, np.uint64),
+                           np.array(self.starts, np.uint64),
+                           np.array(self.rows, self.dtype).reshape(len(self.rows), self.num_arms))
+        return self.frozen
+
+    @property
+    def num_trials(self):
+        return len(self.arrays()[0])
+
+    def trial_runs(self, trial):
+        trials, starts, _ = self.arrays()
+        first = int(trials[trial])
+        last = int(trials[trial + 1]) if trial + 1 < len(trials) else len(starts)
+        return first, last
+
+    def matching_at(self, t, trial=0):
+        '''
+            Matching of round t of the trial, indexed by arms and valued by players
+            (-1 if unmatched), the matching of the last change point before t
+        '''
+        _, starts, rows = self.arrays()
+        first, last = self.trial_runs(trial)
+        run = first + np.searchsorted(starts[first:last], t, 'right') - 1
+        if run < first:
+            raise IndexError("Round %d is before the first round of trial %d" % (t, trial))
+        return rows[run].astype(int) - 1
+
+    def change_points(self, trial=0):
+        '''
+            Yields (t, matching) for each round of the trial where the matching changes
+        '''
+        _, starts, rows = self.arrays()
+        first, last = self.trial_runs(trial)
+        for run in range(first, last):
+            yield int(starts[run]), rows[run].astype(int) - 1
+
+    def save(self, path):
+        '''
+            Binary file of a header of 6 uint64 followed by the first run of each trial, the start of
+            each run and the rows
+        '''
+        trials, starts, rows = self.arrays()
+        header = np.array([self.num_players, self.num_arms, len(trials), len(starts),
+                           rows.dtype.itemsize, 0], np.uint64)
+        with open(path, 'wb') as f:
+            f.write(self.magic)
+            header.tofile(f)
+            trials.tofile(f)
+            starts.tofile(f)
+            rows.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        '''
+            Trace saved by save, the rows being mapped from the file rather than read
+        '''
+        with open(path, 'rb') as f:
+            if f.read(len(cls.magic)) != cls.magic:
+                raise ValueError(path + " is not a matching trace")
+            num_players, num_arms, num_trials, num_runs, _, _ = np.fromfile(f, np.uint64, 6).tolist()
+            trials = np.fromfile(f, np.uint64, num_trials)
+            starts = np.fromfile(f, np.uint64, num_runs)
+            offset = f.tell()
+
+        trace = cls(num_players, num_arms)
+        rows = np.memmap(path, trace.dtype, 'r', offset, (num_runs, num_arms)) if num_runs \
+            else np.zeros((0, num_arms), trace.dtype)
+        trace.trials, trace.starts, trace.rows = trials.tolist(), starts.tolist(), list(rows)
+        trace.frozen = (trials, starts, rows)
+        if num_runs:
+            trace.last_t = int(starts[-1])
+            trace.last = rows[-1].astype(int) - 1
+        return trace
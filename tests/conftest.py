@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from exp_centrailized_ucb_etc import Exp_centralized_UCB_ETC
+from exp_example7 import Exp_example7
+from src.checkpoint import Checkpointer
+from src.GS import GS_Market
+
+
+def make_example7(horizon=300, trials=2, **attributes):
+    exp = Exp_example7()
+    exp.horizon, exp.trials = horizon, trials
+    for name, value in attributes.items():
+        setattr(exp, name, value)
+    return exp
+
+
+def run_example7_UCB(seed=3, optimal=True, path=None, workers=None, vectorized=False,
+                     horizon=300, trials=2, **attributes):
+    exp = make_example7(horizon, trials, **attributes)
+    exp.run_example7_UCB(optimal, vectorized, workers, seed,
+                         None if path is None else Checkpointer(path, 100))
+    return np.array(exp.regrets)
+
+
+def round_based_GS(players_rankings, arms_rankings):
+    '''
+        GS of the original GS_Market, every free player proposing in each round, returning the
+        matching and the number of proposals
+    '''
+    num_players, num_arms = len(players_rankings), len(arms_rankings)
+    propose_order = np.zeros(num_players, int)
+    matched = np.zeros(num_players, bool)
+    matching = [[] for _ in range(num_arms)]
+    proposals = 0
+
+    while np.sum(matched) != num_players:
+        for p_idx in range(num_players):
+            if not matched[p_idx]:
+                matching[players_rankings[p_idx][propose_order[p_idx]]].append(p_idx)
+                proposals += 1
+
+        for a_idx in range(num_arms):
+            a_choices = matching[a_idx]
+            if len(a_choices) != 0:
+                a_choice = next(x for x in arms_rankings[a_idx] if x in a_choices)
+                matching[a_idx] = [a_choice]
+                for p_idx in a_choices:
+                    matched[p_idx] = (p_idx == a_choice)
+                    propose_order[p_idx] += (p_idx != a_choice)
+
+    return np.array([choices[0] if choices else -1 for choices in matching]), proposals
+
+
+def make_centralized(num_players=4, num_arms=4, horizon=200, trials=2, bernoulli=False, dtype=float,
+                     **attributes):
+    exp = Exp_centralized_UCB_ETC(num_players, num_arms, horizon=horizon, trials=trials,
+                                  bernoulli=bernoulli, dtype=dtype)
+    for name, value in attributes.items():
+        setattr(exp, name, value)
+    return exp
+
+
+@pytest.fixture
+def example7():
+    '''
+        Example 7 with a short horizon, the given attributes set on it
+    '''
+    return make_example7
+
+
+@pytest.fixture
+def run_UCB():
+    '''
+        Regrets of the example 7 UCB, seeded with 3 unless told otherwise
+    '''
+    return run_example7_UCB
+
+
+@pytest.fixture
+def centralized():
+    '''
+        The centralized UCB and ETC experiment on a small market
+    '''
+    return make_centralized
+
+
+@pytest.fixture
+def reference_GS():
+    '''
+        The round based GS of the original simulator, for markets with at least as many arms as players
+    '''
+    return round_based_GS
+
+
+@pytest.fixture
+def interrupted(monkeypatch):
+    '''
+        Runs run, interrupted by a KeyboardInterrupt on the given call to GS_Market.match
+    '''
+    def interrupt(calls, run, *args, **kwargs):
+        match = GS_Market.match
+        count = [0]
+
+        def interrupted_match(self, *args, **kwargs):
+            count[0] += 1
+            if count[0] == calls:
+                raise KeyboardInterrupt
+            return match(self, *args, **kwargs)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(GS_Market, 'match', interrupted_match)
+            with pytest.raises(KeyboardInterrupt):
+                run(*args, **kwargs)
+    return interrupt
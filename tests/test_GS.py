@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.GS import GS_Market, stable_matching
+from src.profiling import Match_Stats
+from src.state import Market_State
+
+
+@pytest.mark.parametrize('num_players, num_arms', [(30, 30), (20, 35)])
+def test_stable_matching_gives_the_matching_of_the_round_based_GS(reference_GS, num_players, num_arms):
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        players_rankings = np.argsort(rng.random((num_players, num_arms)), axis=1)
+        arms_rankings = np.argsort(rng.random((num_arms, num_players)), axis=1)
+        stats = Match_Stats()
+        matching = stable_matching(players_rankings, arms_rankings, stats=stats)
+        reference, proposals = reference_GS(players_rankings, arms_rankings)
+        assert np.array_equal(matching, reference)
+        assert stats.proposals == proposals
+
+
+def test_rankings_of_the_players_are_their_sorted_ucb():
+    # Bernoulli rewards, so that arms pulled as often with the same rewards tie on their ucb
+    state = Market_State(6, 8)
+    players = state.make_players([np.arange(8)] * 6)
+    arms = state.make_arms(np.random.default_rng(0).uniform(0, 1, (8, 6)), 1, [np.arange(6)] * 8,
+                           bernoulli=True)
+    market = GS_Market(6, 8)
+    np.random.seed(0)
+    for _ in range(300):
+        rankings = [player.get_ranking().copy() for player in players]
+        market.match(players, arms)
+        # the matrix GS ran on holds the rankings of the round
+        assert np.array_equal(market.players_rankings, rankings)
+        for player in players:
+            assert np.array_equal(player.get_ranking(), np.argsort(-player.ucb, kind='stable'))
+
+
+def test_stats_do_not_change_the_regrets(run_UCB):
+    market = GS_Market(20, 20, stats=Match_Stats())
+    assert np.array_equal(run_UCB(two_side_market=market), run_UCB())
+    assert market.stats.rounds == 600
+
+
+@pytest.mark.parametrize('repair_fraction', [0.25, 1])
+def test_warm_start_gives_the_regrets_of_a_plain_GS(example7, repair_fraction):
+    regrets = []
+    for warm_start in [False, True]:
+        exp = example7(2000, two_side_market=GS_Market(20, 20, warm_start))
+        exp.two_side_market.repair_fraction = repair_fraction
+        exp.run_example7_UCB(seed=1)
+        regrets.append(np.array(exp.regrets))
+    assert np.array_equal(regrets[0], regrets[1])
+    assert exp.two_side_market.cache_hits > 0
+    if repair_fraction == 1:
+        assert exp.two_side_market.cache_repairs > 0
+
+
+def test_repairs_give_the_matching_of_a_plain_GS():
+    rng = np.random.default_rng(0)
+    market = GS_Market(30, 30, warm_start=True)
+    market.repair_fraction = 1
+    market.arms_rankings = np.argsort(rng.random((30, 30)), axis=1)
+    market.players_rankings = np.argsort(rng.random((30, 30)), axis=1)
+    for _ in range(300):
+        # swap two neighbouring arms in the ranking of a few players
+        players_rankings = market.players_rankings.copy()
+        for p_idx in rng.integers(30, size=rng.integers(1, 4)):
+            i = rng.integers(29)
+            players_rankings[p_idx, [i, i + 1]] = players_rankings[p_idx, [i + 1, i]]
+        market.players_rankings = players_rankings
+        assert np.array_equal(market.Gale_Shapley(),
+                              stable_matching(market.players_rankings, market.arms_rankings))
+    assert market.cache_repairs > 0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.backend import Backend_Market, check_options, get_backend
+from src.checkpoint import Checkpointer
+from src.GS import stable_matching
+from src.profiling import Match_Stats
+from src.regret import Regret_Accumulator
+from src.reward import Philox_Reward_Oracle
+
+backends = ['numpy', 'numba']
+
+
+def markets():
+    rng = np.random.default_rng(0)
+    # the market of the centralized UCB experiment, and a random one with more players than arms
+    return [(np.linspace(0.9, 0, 10)[:, None] * np.ones(10), 1, np.tile(np.arange(10), (10, 1))),
+            (rng.uniform(0, 1, (8, 12)), 1, np.argsort(rng.random((8, 12)), axis=1))]
+
+
+@pytest.mark.parametrize('arms_mean, arms_var, arms_rankings', markets())
+def test_backends_give_the_same_regrets(arms_mean, arms_var, arms_rankings):
+    pytest.importorskip('numba')
+    players_rankings = np.argsort(-arms_mean.T, axis=1, kind='stable')
+    optimal_matching = stable_matching(players_rankings, arms_rankings)
+
+    regrets = []
+    for backend in backends:
+        regret_accumulator = Regret_Accumulator(arms_mean, optimal_matching, 2000)
+        market = Backend_Market(arms_mean, arms_var, arms_rankings, backend)
+        regrets.append(market.run_UCB(2000, 3, regret_accumulator, seed=0).copy())
+    assert np.array_equal(regrets[0], regrets[1])
+
+
+def test_backends_give_the_same_matchings():
+    pytest.importorskip('numba')
+    rng = np.random.default_rng(0)
+    players_rankings = np.argsort(rng.random((50, 40)), axis=1)
+    arms_rankings = np.argsort(rng.random((40, 50)), axis=1)
+    matchings = [get_backend(backend).stable_matching(players_rankings, arms_rankings) for backend in backends]
+    assert np.array_equal(matchings[0], matchings[1])
+
+
+@pytest.mark.parametrize('name, value', [('reward_chunk', 64), ('reward_oracle', Philox_Reward_Oracle(0, 3, 3)),
+                                         ('fast_forward', 50)])
+def test_backend_rejects_the_options_it_ignores(centralized, name, value):
+    exp = centralized(3, 3, horizon=100, trials=1, backend='numpy', **{name: value})
+    with pytest.raises(ValueError, match=name):
+        exp.run_centralized_UCB()
+
+
+@pytest.mark.parametrize('engine', [{'backend': 'numpy'}, {'sparse': True}])
+def test_array_engines_reject_a_float32_state(example7, centralized, engine):
+    with pytest.raises(ValueError, match="dtype float32"):
+        example7(100, 1, dtype=np.float32, **engine).run_example7_UCB()
+
+    if 'backend' in engine:
+        exp = centralized(3, 3, horizon=100, trials=1, dtype=np.float32, backend='numpy')
+        with pytest.raises(ValueError, match="dtype float32"):
+            exp.run_centralized_UCB()
+
+
+def test_backend_rejects_stats_and_checkpointer(tmp_path, example7):
+    exp = example7(100, 1, backend='numpy')
+    exp.two_side_market.stats = Match_Stats()
+    with pytest.raises(ValueError, match="stats, checkpointer"):
+        exp.run_example7_UCB(checkpointer=Checkpointer(str(tmp_path / 'snapshot.npz')))
+
+    exp.two_side_market.stats = None
+    exp.run_example7_UCB(seed=0)
+
+
+def test_oracle_players_are_rejected(centralized):
+    players = centralized(3, 3).players
+    check_options("The backend numpy", players)
+    players[0].oracle = True
+    with pytest.raises(ValueError, match="oracle players"):
+        check_options("The backend numpy", players)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from benchmark import compare, gs_rankings, run_benchmarks
+from src.GS import GS_Market
+from src.profiling import Match_Stats
+
+
+@pytest.mark.parametrize('structure', ['identical', 'random', 'adversarial'])
+def test_benchmarked_GS_gives_the_matching_of_the_round_based_GS(reference_GS, structure):
+    for size in [2, 10, 31]:
+        market = GS_Market(size, size, stats=Match_Stats())
+        market.players_rankings, market.arms_rankings = gs_rankings(structure, size, np.random.default_rng(0))
+        matching, proposals = reference_GS(market.players_rankings, market.arms_rankings)
+        assert np.array_equal(market.Gale_Shapley(), matching)
+        assert market.stats.proposals == proposals
+        if structure == 'adversarial':
+            assert proposals == size * (size - 1) + 1
+
+
+def test_compare_flags_the_slowdowns(capsys):
+    report = run_benchmarks(quick=True, only=['arm'])
+    slower = {'results': {name: {'seconds': 2 * timing['seconds']}
+                          for name, timing in report['results'].items()}}
+    assert compare(report, report) == []
+    assert compare(report, slower) == ['arm/sample']
+    assert 'SLOWER' in capsys.readouterr().out
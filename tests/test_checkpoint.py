@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+
+def test_resume_is_exact(tmp_path, run_UCB, interrupted):
+    path = str(tmp_path / 'snapshot.npz')
+    interrupted(450, run_UCB, path=path)
+    assert np.array_equal(run_UCB(path=path), run_UCB())
+
+
+def test_finished_run_clears_its_snapshot(tmp_path, run_UCB):
+    path = str(tmp_path / 'snapshot.npz')
+    run_UCB(path=path)
+    assert not (tmp_path / 'snapshot.npz').exists()
+    assert np.array_equal(run_UCB(4, path=path), run_UCB(4))
+
+
+@pytest.mark.parametrize('seed, horizon', [(4, 300), (3, 200), (None, 300)])
+def test_snapshot_of_another_run_is_rejected(tmp_path, run_UCB, interrupted, seed, horizon):
+    path = str(tmp_path / 'snapshot.npz')
+    interrupted(450, run_UCB, path=path)
+    with pytest.raises(ValueError, match="another run"):
+        run_UCB(seed, path=path, horizon=horizon)
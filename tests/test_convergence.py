@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.regret import Regret_Accumulator
+
+
+@pytest.fixture
+def run_centralized_UCB(centralized):
+    def run(bernoulli, fast_forward, dtype=float, workers=None):
+        exp = centralized(2, 2, horizon=3000, bernoulli=bernoulli, dtype=dtype, fast_forward=fast_forward)
+        regrets = np.array(exp.run_centralized_UCB(seed=0, workers=workers))
+        return regrets, exp.fast_forward_rounds
+    return run
+
+
+@pytest.mark.parametrize('dtype', [float, np.float32])
+def test_fast_forward_gives_the_regrets_of_the_full_loop(run_centralized_UCB, dtype):
+    regrets, rounds = run_centralized_UCB(bernoulli=True, fast_forward=100, dtype=dtype)
+    full_regrets, full_rounds = run_centralized_UCB(bernoulli=True, fast_forward=None, dtype=dtype)
+
+    assert all(t is not None for t in rounds)
+    assert full_rounds == [None, None]
+    assert np.array_equal(regrets, full_regrets)
+
+
+def test_workers_return_the_rounds_fast_forwarded(run_centralized_UCB):
+    regrets, rounds = run_centralized_UCB(bernoulli=True, fast_forward=100)
+    worker_regrets, worker_rounds = run_centralized_UCB(bernoulli=True, fast_forward=100, workers=2)
+    assert worker_rounds == rounds
+    assert np.array_equal(worker_regrets, regrets)
+
+
+def test_no_fast_forward_with_gaussian_rewards(run_centralized_UCB):
+    _, rounds = run_centralized_UCB(bernoulli=False, fast_forward=100)
+    assert rounds == [None, None]
+
+
+def test_rounds_credited_at_once_match_round_by_round():
+    rng = np.random.default_rng(0)
+    arms_mean = rng.uniform(0, 1, (3, 3))
+    checkpoints = [1, 7, 50, 51, 300, 999, 1000]
+
+    by_round = Regret_Accumulator(arms_mean, [0, 1, 2], 1000, checkpoints)
+    at_once = Regret_Accumulator(arms_mean, [0, 1, 2], 1000, checkpoints)
+    at_once.block_size = 3 * 64
+    for _ in range(10):
+        by_round.record([1, 2, 0])
+        at_once.record([1, 2, 0])
+    for _ in range(990):
+        by_round.record([2, 0, 1])
+    at_once.record([2, 0, 1], 990)
+
+    assert np.array_equal(by_round.finish_trial(), at_once.finish_trial())
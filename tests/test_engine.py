@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.checkpoint import Checkpointer
+
+
+@pytest.mark.parametrize('optimal', [True, False])
+def test_vectorized_UCB_gives_the_regrets_of_the_objects(run_UCB, optimal):
+    assert np.array_equal(run_UCB(5, optimal, vectorized=True, horizon=400, trials=3),
+                          run_UCB(5, optimal, horizon=400, trials=3))
+
+
+@pytest.mark.parametrize('h', [0, 1, 7, 50])
+def test_vectorized_ETC_gives_the_regrets_of_the_objects(centralized, h):
+    exp = centralized(6, 6, horizon=300, trials=3)
+    assert np.allclose(exp.run_centralized_ETC(h, vectorized=True, seed=2),
+                       exp.run_centralized_ETC(h, seed=2), rtol=0, atol=1e-9)
+
+
+def test_vectorized_ETC_sweeps_an_empty_exploration(centralized):
+    exp = centralized(5, 7)
+    explore_rounds = [0, 3, 40]
+    regrets = exp.run_centralized_ETC_vectorized(explore_rounds, seed=[1, 40])
+    assert np.allclose(regrets[2], exp.run_centralized_ETC(40, seed=1), rtol=0, atol=1e-9)
+    assert np.allclose(regrets[0], exp.run_centralized_ETC(0, seed=1), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('option, value', [('reward_chunk', 100), ('reward_blocks', 4),
+                                           ('fast_forward', 100), ('dtype', np.float32)])
+def test_vectorized_engine_rejects_what_it_ignores(example7, centralized, option, value):
+    with pytest.raises(ValueError, match='vectorized'):
+        example7(**{option: value}).run_example7_UCB(vectorized=True)
+
+    exp = centralized(horizon=100, trials=1, **{option: value})
+    with pytest.raises(ValueError, match='vectorized'):
+        exp.run_centralized_UCB(vectorized=True)
+    with pytest.raises(ValueError, match='vectorized'):
+        exp.run_centralized_ETC(5, vectorized=True)
+
+
+def test_vectorized_engine_rejects_a_checkpointer(tmp_path, example7):
+    with pytest.raises(ValueError, match='checkpointer'):
+        example7().run_example7_UCB(vectorized=True, checkpointer=Checkpointer(str(tmp_path / 'snapshot.npz'), 100))
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from exp_example6 import Exp_example6, GS_Market_
+
+
+@pytest.mark.parametrize('seed', [None, 0])
+def test_every_trial_starts_from_the_preset_ucb_of_agent_3(monkeypatch, seed):
+    first_ucbs = []
+    match = GS_Market_.match
+
+    def spy(market, players, arms, ucb=True):
+        if market.t == 0:
+            first_ucbs.append((players[2].ucb.copy(), players[2].get_ranking().copy()))
+        return match(market, players, arms, ucb)
+
+    monkeypatch.setattr(GS_Market_, 'match', spy)
+    exp = Exp_example6()
+    exp.horizon, exp.trials = 20, 4
+    exp.run_example6_UCB(seed=seed)
+
+    assert len(first_ucbs) == 4
+    for ucb, ranking in first_ucbs:
+        assert np.array_equal(ucb, [2.3, 0, 0])
+        assert np.array_equal(ranking, [0, 1, 2])
+
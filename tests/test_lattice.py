@@ -0,0 +1,45 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from src.lattice import stable_lattice
+
+
+def stable_matchings(players_rankings, arms_rankings):
+    '''
+        Every stable matching of a square market, searched among all the matchings
+    '''
+    size = len(players_rankings)
+    players_inverse = np.argsort(players_rankings, axis=1)
+    arms_inverse = np.argsort(arms_rankings, axis=1)
+
+    matchings = []
+    for matching in permutations(range(size)):
+        partner = np.argsort(matching)
+        blocking = any(players_inverse[p_idx, a_idx] < players_inverse[p_idx, partner[p_idx]]
+                       and arms_inverse[a_idx, p_idx] < arms_inverse[a_idx, matching[a_idx]]
+                       for p_idx in range(size) for a_idx in range(size))
+        if not blocking:
+            matchings.append(matching)
+    return matchings
+
+
+def markets():
+    rng = np.random.default_rng(4)
+    # player p_idx ranks the arms from p_idx on and arm a_idx the players after a_idx, so
+    # each of the 6 shifts is a stable matching
+    cyclic = (np.arange(6)[:, None] + np.arange(6)) % 6
+    return [(np.argsort(rng.random((6, 6)), axis=1), np.argsort(rng.random((6, 6)), axis=1))
+            for _ in range(4)] + [(cyclic, (cyclic + 1) % 6)]
+
+
+@pytest.mark.parametrize('players_rankings, arms_rankings', markets())
+def test_lattice_holds_every_stable_matching(reference_GS, players_rankings, arms_rankings):
+    lattice = stable_lattice(players_rankings, arms_rankings)
+    expected = stable_matchings(players_rankings, arms_rankings)
+
+    assert sorted(map(tuple, lattice.all_matchings())) == sorted(expected)
+    assert np.array_equal(lattice.optimal, reference_GS(players_rankings, arms_rankings)[0])
+    arms_matching, _ = reference_GS(arms_rankings, players_rankings)
+    assert np.array_equal(lattice.pessimal, np.argsort(arms_matching))
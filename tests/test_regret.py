@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.regret import Regret_Accumulator
+from src.trace import Matching_Trace
+
+
+def test_streaming_regrets_match_the_regrets_of_every_round(example7):
+    exp = example7(trials=3)
+    exp.two_side_market.trace = Matching_Trace(exp.num_players, exp.num_arms)
+    exp.run_example7_UCB(seed=2)
+
+    # the regrets of the original experiment, listed round by round from the traced matchings
+    arms_mean = exp.market_state.arms_mean
+    optimal_mean = exp.regret_accumulator.optimal_mean
+    regrets = np.zeros((exp.num_players, exp.horizon))
+    for trial in range(exp.trials):
+        regrets_one_trial = [[] for _ in range(exp.num_players)]
+        for t in range(1, exp.horizon + 1):
+            for a_idx, p_idx in enumerate(exp.two_side_market.trace.matching_at(t, trial)):
+                regrets_one_trial[p_idx].append(optimal_mean[p_idx] - arms_mean[a_idx, p_idx])
+        regrets += np.cumsum(np.array(regrets_one_trial), axis=1)
+    regrets /= exp.trials
+
+    assert np.allclose(exp.regrets, regrets, rtol=0, atol=1e-12)
+
+
+def test_checkpoints_keep_the_rounds_of_the_full_curve():
+    rng = np.random.default_rng(0)
+    arms_mean = rng.uniform(0, 1, (5, 4))
+    checkpoints = [1, 10, 150, 299, 300]
+    full = Regret_Accumulator(arms_mean, [0, 1, 2, 3, -1], 300)
+    sparse = Regret_Accumulator(arms_mean, [0, 1, 2, 3, -1], 300, checkpoints)
+    for _ in range(300):
+        matching = np.full(5, -1)
+        matching[rng.permutation(5)[:4]] = np.arange(4)
+        full.record(matching)
+        sparse.record(matching)
+    assert np.array_equal(full.finish_trial()[:, np.array(checkpoints) - 1], sparse.finish_trial())
@@ -0,0 +1,63 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.reward import Block_Reward_Source, Philox_Reward_Oracle, bernoulli_reward, set_reward_streams
+from src.state import Market_State
+
+
+def test_blocks_are_arrays_bounded_by_max_blocks():
+    source = Block_Reward_Source([0.5, 0.2, 0.1], 1, seed=0, chunk_rounds=64, max_blocks=2)
+    rewards = [source.sample(1) for _ in range(64 * 5)]
+
+    assert len(source.blocks) == 2
+    assert all(isinstance(block, np.ndarray) and block.nbytes == 64 * 3 * 8 for block in source.blocks.values())
+    assert all(type(reward) is float for reward in rewards)
+
+    # the noise of a block only depends on the seed, the arm and the block
+    seed = np.random.SeedSequence(0, spawn_key=(0, 4))
+    noise = np.random.Generator(np.random.PCG64(seed)).standard_normal((64, 3))[:, 1]
+    assert rewards[-64:] == (0.2 + noise).tolist()
+
+
+def test_pickled_source_draws_the_same_rewards():
+    source = Block_Reward_Source([0.5, 0.2], 1, seed=3, chunk_rounds=16)
+    for _ in range(20):
+        source.sample(0)
+    copy = pickle.loads(pickle.dumps(source))
+    assert [copy.sample(0) for _ in range(40)] == [source.sample(0) for _ in range(40)]
+
+
+def test_oracle_noise_only_depends_on_trial_round_and_arm():
+    oracle = Philox_Reward_Oracle(5, 4, 3)
+    pulls = [(trial, t, a_idx) for trial in range(2) for t in range(1, 6) for a_idx in range(4)]
+    noise = {pull: oracle.noise(*pull, 0) for pull in pulls}
+
+    other = Philox_Reward_Oracle(5, 4, 3)
+    for pull in reversed(pulls):
+        assert [other.noise(*pull, p_idx) for p_idx in range(3)] == [noise[pull]] * 3
+    assert oracle.round_noise(0, 1).shape == (4,)
+
+
+def test_oracle_rewards_do_not_depend_on_the_workers(run_UCB):
+    oracle = Philox_Reward_Oracle(1, 20, 20)
+    assert np.array_equal(run_UCB(None, reward_oracle=oracle), run_UCB(2, workers=2, reward_oracle=oracle))
+
+
+@pytest.mark.parametrize('bernoulli', [False, True])
+def test_oracle_rewards_are_the_rewards_of_the_arms_for_its_noise(bernoulli):
+    state = Market_State(3, 4)
+    arms = state.make_arms(np.random.default_rng(0).uniform(0, 1, (4, 3)), 0.5, [np.arange(3)] * 4,
+                           bernoulli=bernoulli)
+    oracle = Philox_Reward_Oracle(9, 4, 3)
+    for trial in range(2):
+        set_reward_streams(arms, oracle=oracle, trial_idx=trial)
+        for t in range(1, 50):
+            bit_generator = np.random.Philox(counter=[0, t, 0, 0], key=np.array([9, trial], np.uint64))
+            noise = np.random.Generator(bit_generator).standard_normal(4)
+            for a_idx, arm in enumerate(arms):
+                for p_idx in range(3):
+                    mean = arm.mean[p_idx]
+                    expected = bernoulli_reward(mean, noise[a_idx]) if bernoulli else mean + 0.5 * noise[a_idx]
+                    assert arm.sample(p_idx, t) == expected
@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from run_experiment import run_experiment
+
+
+@pytest.mark.parametrize('stats', [False, True])
+def test_config_gives_the_regrets_of_the_experiment(tmp_path, run_UCB, stats):
+    config = {'experiment': 'example7', 'attributes': {'horizon': 300, 'trials': 2},
+              'run': {'seed': 3}, 'stats': stats}
+    with np.load(run_experiment(config, str(tmp_path / 'example7.npz'))) as results:
+        assert np.array_equal(results['regrets'], run_UCB())
+        assert json.loads(str(results['config'])) == config
+        assert ('stats' in results) == stats
+
+
+def test_centralized_config_gives_the_regrets_of_the_experiment(tmp_path, centralized):
+    config = {'experiment': 'centralized_UCB_ETC', 'init': {'num_players': 4, 'num_arms': 4, 'horizon': 200,
+                                                            'trials': 2},
+              'run': {'explore_rounds': [5], 'seed': 1}}
+    exp = centralized()
+    exp.run_centralized_UCB_ETC([5], seed=1)
+    with np.load(run_experiment(config, str(tmp_path / 'centralized.npz'))) as results:
+        assert np.array_equal(results['regrets_ucb'], np.stack([np.asarray(curve) for curve in exp.regrets_ucb]))
+        assert np.array_equal(results['regrets_etc'], np.stack([np.asarray(curve) for curve in exp.regrets_etc]))
+
+
+def test_experiments_start_without_matplotlib():
+    code = "import sys, run_experiment, exp_example2, exp_example6, exp_example7, exp_centrailized_ucb_etc; " \
+           "assert 'matplotlib' not in sys.modules and 'tqdm' not in sys.modules"
+    subprocess.run([sys.executable, '-c', code], check=True)
@@ -0,0 +1,52 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from exp_example6 import Exp_example6
+from src.experiment import Worker_Trial
+from src.profiling import Match_Stats
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_workers_give_the_regrets_of_the_objects_in_process(run_UCB, workers):
+    assert np.array_equal(run_UCB(4, workers=workers, trials=3), run_UCB(4, trials=3))
+
+
+def test_every_experiment_runs_its_trials_on_workers(centralized):
+    exp = centralized()
+    assert np.array_equal(np.array(exp.run_centralized_UCB(seed=1, workers=2)),
+                          np.array(exp.run_centralized_UCB(seed=1)))
+    assert np.array_equal(np.array(exp.run_centralized_ETC(3, seed=1, workers=2)),
+                          np.array(exp.run_centralized_ETC(3, seed=1)))
+
+    exp = Exp_example6()
+    exp.run_example6_UCB(seed=1, workers=2)
+    on_workers = np.array(exp.regrets)
+    exp.run_example6_UCB(seed=1)
+    assert np.array_equal(on_workers, np.array(exp.regrets))
+
+
+def test_workers_are_not_sent_the_regrets(example7):
+    exp = example7(5000, 3)
+    exp.run_example7_UCB(seed=0)
+    players = exp.market_state.make_players([np.arange(exp.num_arms)] * exp.num_players)
+    arms = exp.market_state.make_arms(exp.market_state.arms_mean, 1, exp.market_state.arms_rankings)
+
+    trial = Worker_Trial(exp, 'run_example7_UCB_trial', (), players, arms, exp.regret_accumulator)
+    sent = len(pickle.dumps(trial))
+    assert sent < exp.regret_accumulator.mean.nbytes / 4
+    assert sent < 0.2 * len(pickle.dumps((exp, exp.regret_accumulator)))
+
+
+def test_stats_of_the_workers_are_merged(example7):
+    counts = []
+    for workers in [None, 2]:
+        exp = example7(trials=3)
+        exp.two_side_market.stats = Match_Stats()
+        exp.run_example7_UCB(seed=2, workers=workers)
+        stats = exp.two_side_market.stats
+        counts.append((stats.rounds, stats.proposals, stats.max_proposals))
+        assert stats.seconds['GS'] > 0 and stats.throughput > 0
+    assert counts[0] == counts[1]
+    assert counts[1][0] == exp.horizon * exp.trials
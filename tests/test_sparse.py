@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.GS import stable_matching
+from src.sparse import Sparse_Market, reposition, sparse_Gale_Shapley
+
+
+@pytest.mark.parametrize('optimal', [True, False])
+def test_sparse_engine_gives_the_regrets_of_the_objects(run_UCB, optimal):
+    assert np.array_equal(run_UCB(optimal=optimal, horizon=500, sparse=True),
+                          run_UCB(optimal=optimal, horizon=500))
+
+
+def test_sparse_k_truncates_the_lists_of_example7(run_UCB):
+    sparse = run_UCB(horizon=500, sparse=True)
+    assert np.array_equal(run_UCB(horizon=500, sparse=True, sparse_k=20), sparse)
+    truncated = run_UCB(horizon=500, sparse=True, sparse_k=5)
+    # the players after the 5th never hold one of the 5 arms they list once the arms settle
+    assert not np.array_equal(truncated, sparse)
+    assert (np.diff(truncated[10, -100:]) > 0).all()
+
+
+@pytest.mark.parametrize('identical', [True, False])
+def test_sparse_Gale_Shapley_matches_the_dense_GS(identical):
+    rng = np.random.default_rng(1)
+    num_players, num_arms = 60, 40
+    if identical:
+        players_rankings = np.tile(np.arange(num_arms), (num_players, 1))
+        arms_rankings = np.tile(np.arange(num_players), (num_arms, 1))
+    else:
+        players_rankings = np.argsort(rng.random((num_players, num_arms)), axis=1)
+        arms_rankings = np.argsort(rng.random((num_arms, num_players)), axis=1)
+    market = Sparse_Market.from_dense(np.ones((num_arms, num_players)), 1, players_rankings, arms_rankings)
+    matching, _ = sparse_Gale_Shapley(market.players_lists, market.arms_ranks, num_arms)
+    assert np.array_equal(matching, stable_matching(players_rankings, arms_rankings))
+
+
+def test_reposition_sorts_like_lexsort():
+    rng = np.random.default_rng(0)
+    num_rows, k = 300, 12
+    # few distinct keys, so that many slots tie and are ordered by arm
+    keys = rng.integers(4, size=(num_rows, k)) / 4
+    proposals = np.argsort(rng.random((num_rows, k)), axis=1)
+    order = np.lexsort((proposals, keys), axis=1)
+    ranked, proposals = np.take_along_axis(keys, order, axis=1), np.take_along_axis(proposals, order, axis=1)
+
+    for _ in range(20):
+        rows = rng.choice(num_rows, 200, replace=False)
+        src = rng.integers(k, size=len(rows))
+        new_keys = rng.integers(4, size=len(rows)) / 4
+        reposition(ranked, proposals, rows, src, new_keys)
+
+        expected = np.lexsort((proposals, ranked), axis=1)
+        assert np.array_equal(expected, np.tile(np.arange(k), (num_rows, 1)))
+
@@ -0,0 +1,74 @@
+import tracemalloc
+
+import numpy as np
+
+from src.arm import Arm
+from src.player import Player
+from src.state import Market_State
+
+
+def market(num_players, num_arms, dtype=float):
+    state = Market_State(num_players, num_arms, dtype)
+    players = state.make_players([np.arange(num_arms)] * num_players)
+    arms = state.make_arms(np.ones((num_arms, num_players)), 1, [np.arange(num_players)] * num_arms)
+    return state, players, arms
+
+
+def test_players_and_arms_are_views_onto_the_state():
+    state, players, arms = market(4, 3)
+    players[2].update(1, 0.5, 1)
+    players[2].count = [1, 2, 3]
+    arms[1].mean = [0.1, 0.2, 0.3, 0.4]
+
+    assert np.array_equal(state.count[2], [1, 2, 3])
+    assert state.est_mean[2, 1] == 0.5
+    assert np.array_equal(state.arms_mean[1], [0.1, 0.2, 0.3, 0.4])
+    assert np.shares_memory(players[0].ucb, state.ucb)
+
+
+def test_standalone_views_only_hold_their_side():
+    player = Player(5, np.arange(5))
+    arm = Arm(4, np.zeros(4), 1, np.arange(4))
+
+    assert player.state.arms_mean is None and player.state.arms_rankings is None
+    assert arm.state.count is None and arm.state.ucb is None
+    assert player.state.nbytes == 5 * 8 * 5
+    assert arm.state.nbytes == 4 * 8 * 2
+
+
+def test_float32_halves_the_memory():
+    assert market(300, 200, np.float32)[0].nbytes * 2 == market(300, 200)[0].nbytes
+
+
+def traced_bytes(build):
+    tracemalloc.start()
+    try:
+        objects = build()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def test_shared_state_uses_less_memory_than_standalone_objects():
+    num_players = num_arms = 200
+
+    def standalone():
+        players = [Player(num_arms, np.arange(num_arms)) for _ in range(num_players)]
+        arms = [Arm(num_players, np.ones(num_players), 1, np.arange(num_players)) for _ in range(num_arms)]
+        return players, arms
+
+    standalone_bytes = traced_bytes(standalone)
+    shared_bytes = traced_bytes(lambda: market(num_players, num_arms))
+    float32_bytes = traced_bytes(lambda: market(num_players, num_arms, np.float32))
+
+    assert shared_bytes < standalone_bytes
+    assert float32_bytes < 0.6 * shared_bytes
+
+
+def test_experiment_runs_on_a_float32_state(example7):
+    exp = example7(200, 1, dtype=np.float32)
+    exp.run_example7_UCB(seed=0)
+
+    assert exp.market_state.dtype == np.float32
+    assert exp.market_state.count.dtype == np.float32
+    assert np.isfinite(np.asarray(exp.regrets)).all()
@@ -0,0 +1,52 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+
+def stored_files(storage_dir):
+    return sorted(name for _, _, names in os.walk(storage_dir) for name in names)
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_no_curve_is_left_on_disk(tmp_path, run_UCB, workers):
+    storage_dir = str(tmp_path / 'store')
+    assert np.array_equal(run_UCB(workers=workers, storage_dir=storage_dir), run_UCB(workers=workers))
+    assert 'meta.json' in stored_files(storage_dir)
+    assert not [name for name in stored_files(storage_dir) if name.startswith('curve')]
+
+
+@pytest.mark.parametrize('engine', [{}, {'backend': 'numpy'}, {'sparse': True}])
+def test_workers_are_not_sent_the_store(tmp_path, example7, run_UCB, engine):
+    storage_dir = str(tmp_path / 'store')
+    assert np.array_equal(run_UCB(workers=2, storage_dir=storage_dir, **engine), run_UCB(**engine))
+
+    exp = example7(50, 1, storage_dir=storage_dir)
+    exp.run_example7_UCB()
+    with pytest.raises(TypeError):
+        pickle.dumps(exp.regret_accumulator)
+
+
+def test_snapshot_does_not_copy_the_store(tmp_path, run_UCB, interrupted):
+    storage_dir, path = str(tmp_path / 'store'), str(tmp_path / 'snapshot.npz')
+    interrupted(450, run_UCB, path=path, storage_dir=storage_dir)
+
+    with np.load(path) as state:
+        assert 'mean' not in state and 'm2' not in state
+        assert str(state['store']) == os.path.join(storage_dir, 'example7_UCB')
+
+
+@pytest.mark.parametrize('calls', [450, 310])
+def test_resume_from_the_store_is_exact(tmp_path, run_UCB, interrupted, calls):
+    # 310 stops after the first trial was stored but before the second one was snapshotted
+    storage_dir, path = str(tmp_path / 'store'), str(tmp_path / 'snapshot.npz')
+    interrupted(calls, run_UCB, path=path, storage_dir=storage_dir)
+    assert np.array_equal(run_UCB(path=path, storage_dir=storage_dir), run_UCB())
+
+
+def test_resume_uses_the_store_of_the_snapshot(tmp_path, run_UCB, interrupted):
+    storage_dir, path = str(tmp_path / 'store'), str(tmp_path / 'snapshot.npz')
+    interrupted(450, run_UCB, path=path, storage_dir=storage_dir)
+    assert np.array_equal(run_UCB(path=path, storage_dir=str(tmp_path / 'elsewhere')), run_UCB())
+    assert not os.path.exists(str(tmp_path / 'elsewhere'))
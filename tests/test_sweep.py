@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+from exp_centrailized_ucb_etc import centralized_UCB_ETC_job
+from exp_example2 import Exp_example2, example2_job
+from src.reward import Philox_Reward_Oracle
+from src.sweep import Sweep
+
+
+@pytest.fixture
+def configured(centralized):
+    def build(storage_dir=None):
+        return centralized(3, 3, bernoulli=True, dtype=np.float32, reward_chunk=64, reward_blocks=2,
+                           fast_forward=50, storage_dir=storage_dir)
+    return build
+
+
+def test_every_setting_keys_the_cache(tmp_path, configured):
+    exp = configured()
+    assert {'arms_var', 'bernoulli', 'dtype', 'reward_chunk', 'reward_blocks', 'reward_oracle',
+            'fast_forward', 'backend', 'optimal'} <= set(exp.run_settings())
+    assert 'storage_dir' not in exp.run_settings()
+
+    cache_dir = str(tmp_path / 'cache')
+    exp.run_centralized_UCB_ETC([5], cache_dir=cache_dir, seed=1)
+    optimal = np.array(exp.regrets_ucb)
+    exp.run_centralized_UCB_ETC([5], cache_dir=cache_dir, seed=1, optimal=False)
+    assert len(os.listdir(cache_dir)) == 4
+    assert not np.array_equal(np.array(exp.regrets_ucb), optimal)
+
+
+def test_centralized_job_applies_the_settings(tmp_path, configured):
+    exp = configured(str(tmp_path / 'store'))
+    for optimal in (True, False):
+        # the regrets are read from the store before the next run overwrites it
+        config = dict(exp.run_settings(optimal), algorithm='UCB')
+        regrets = np.array(centralized_UCB_ETC_job(config, 5)['regrets'])
+        assert np.array_equal(regrets, np.array(exp.run_centralized_UCB(optimal, seed=5)))
+        config = dict(exp.run_settings(optimal), algorithm='ETC', h=5)
+        regrets = np.array(centralized_UCB_ETC_job(config, 5)['regrets'])
+        assert np.array_equal(regrets, np.array(exp.run_centralized_ETC(5, optimal, seed=5)))
+
+
+def test_example2_job_applies_the_settings():
+    exp = Exp_example2()
+    exp.horizon, exp.trials, exp.dtype = 100, 3, np.float32
+    exp.reward_oracle = Philox_Reward_Oracle(7, exp.num_arms, exp.num_players)
+    exp.delta = np.array([0.5])
+    config = dict(exp.run_settings(False), delta=0.5)
+
+    exp.run_example2_UCB(False, seed=5)
+    assert np.array_equal(example2_job(config, 5)['regret'], exp.regret_example2[:, 0])
+
+
+def test_keys_do_not_depend_on_the_module_nor_the_storage(tmp_path, configured):
+    cache_dir = str(tmp_path / 'cache')
+    config = configured().run_settings()
+    job = lambda config, seed: {}
+    job.__module__ = '__main__'
+    assert Sweep(job, [], cache_dir, name='Exp_centralized_UCB_ETC').key(config) == \
+        Sweep(centralized_UCB_ETC_job, [], cache_dir, name='Exp_centralized_UCB_ETC').key(config)
+    assert Sweep(centralized_UCB_ETC_job, [], cache_dir).name == 'centralized_UCB_ETC_job'
+
+    exp = configured(str(tmp_path / 'store'))
+    exp.run_centralized_UCB_ETC([5], cache_dir=cache_dir, seed=1)
+    cached = sorted(os.listdir(cache_dir))
+    exp.storage_dir = None
+    exp.run_centralized_UCB_ETC([5], cache_dir=cache_dir, seed=1)
+    assert sorted(os.listdir(cache_dir)) == cached
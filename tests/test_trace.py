@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.GS import GS_Market
+from src.trace import Matching_Trace
+
+
+@pytest.fixture
+def traced_example7(example7):
+    def run(workers=None):
+        exp = example7(trials=3)
+        exp.two_side_market.trace = Matching_Trace(exp.num_players, exp.num_arms)
+        exp.run_example7_UCB(seed=6, workers=workers)
+        return exp.two_side_market.trace
+    return run
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_trace_of_an_experiment_is_saved_and_loaded(tmp_path, traced_example7, workers):
+    trace = traced_example7(workers)
+    path = str(tmp_path / 'example7.trace')
+    trace.save(path)
+    loaded = Matching_Trace.load(path)
+
+    assert loaded.num_trials == 3
+    for saved, read in zip(trace.arrays(), loaded.arrays()):
+        assert np.array_equal(saved, read)
+    for trial in range(3):
+        for (t, matching), (loaded_t, loaded_matching) in zip(trace.change_points(trial),
+                                                              loaded.change_points(trial)):
+            assert t == loaded_t and np.array_equal(matching, loaded_matching)
+        assert np.array_equal(loaded.matching_at(300, trial), trace.matching_at(300, trial))
+
+
+def test_workers_trace_the_trials_run_in_process(traced_example7):
+    in_process, on_workers = traced_example7(), traced_example7(2)
+    for saved, read in zip(in_process.arrays(), on_workers.arrays()):
+        assert np.array_equal(saved, read)
+
+
+
+def test_trace_holds_the_matching_of_every_round(monkeypatch, traced_example7):
+    matchings = []
+    match = GS_Market.match
+
+    def spy(market, *args, **kwargs):
+        matchings.append(match(market, *args, **kwargs).copy())
+        return matchings[-1]
+    monkeypatch.setattr(GS_Market, 'match', spy)
+
+    trace = traced_example7()
+    assert len(matchings) == 3 * 300
+    for i, matching in enumerate(matchings):
+        assert np.array_equal(trace.matching_at(i % 300 + 1, i // 300), matching)